@@ -0,0 +1,43 @@
+"""Compare per-call requests against the pooled EchoVRClient on a local stub API
+
+Usage: python bench_client.py [--calls 500]
+"""
+import argparse
+import time
+
+import requests
+
+from mock_server import MockEchoVR
+from spectate import EchoVRClient
+
+def run(label, call, calls):
+    """Time a number of calls and print the rate"""
+    start = time.perf_counter()
+    for i in range(calls):
+        call(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {calls / elapsed:8.1f} calls/sec")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    server = MockEchoVR().serve()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    client = EchoVRClient(base_url)
+
+    try:
+        run("requests.get /session", lambda i: requests.get(f"{base_url}/session", timeout=2).json(), args.calls)
+        run("client.get_json /session", lambda i: client.get_json("session"), args.calls)
+        run("requests.post /camera_mode",
+            lambda i: requests.post(f"{base_url}/camera_mode", json={"mode": "pov", "num": i % 10}, timeout=2),
+            args.calls)
+        run("client.post_json /camera_mode",
+            lambda i: client.post_json("camera_mode", {"mode": "pov", "num": i % 10}), args.calls)
+    finally:
+        client.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""End-to-end follower benchmark against the mock Echo VR API
+
+Runs `spectate.py --headless` as a child process against a scenario and reports
+time-to-correct-camera after each roster change, request rates and follower CPU.
+With --instances N there is one mock per game client, followed either by N separate
+processes or, with --multi, by a single `--multi` process.
+
+Usage: python bench_follow.py [--scenario late_join] [--duration 12] [--target blue2] [--instances 4 [--multi]]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_server import SCENARIOS, MockEchoVR
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def resident_kb(pid):
+    """Resident memory of a process in KiB, or None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def run_followers(runs, duration, config):
+    """Run headless followers for a while; return their CPU seconds and total resident KiB
+
+    runs is a list of (extra spectate.py arguments, config overrides), one per process.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        followers = []
+        for number, (arguments, overrides) in enumerate(runs):
+            config_file = os.path.join(tmp, f"config{number}.json")
+            with open(config_file, "w") as f:
+                json.dump(dict(config, **overrides), f)
+            followers.append(subprocess.Popen(
+                [sys.executable, os.path.join(HERE, "spectate.py"), "--headless", "--config", config_file] + arguments,
+                stdout=subprocess.DEVNULL))
+
+        before = os.times()
+        time.sleep(duration)
+        memory = [resident_kb(follower.pid) for follower in followers]
+        for follower in followers:
+            follower.terminate()
+        for follower in followers:
+            follower.wait(timeout=10)
+        after = os.times()
+
+    # Child CPU times are only reported once the child has been waited on (always 0 on Windows)
+    cpu_seconds = (after.children_user - before.children_user) + (after.children_system - before.children_system)
+    return cpu_seconds, None if None in memory else sum(memory)
+
+def report(label, mock, duration):
+    print(f"{label}:")
+    for offset, step in mock.events:
+        print(f"  {offset:6.2f}s  {step['action']} {step.get('name', '')}")
+
+    print("  Time to correct camera:")
+    if not mock.recoveries and mock.wrong_since is None:
+        print("    camera never left the target")
+    for cause, seconds in mock.recoveries:
+        print(f"    {seconds * 1000:8.1f} ms after {cause}")
+    if mock.wrong_since is not None:
+        print(f"    still wrong at exit ({time.monotonic() - mock.wrong_since:.2f}s after {mock.wrong_cause})")
+
+    print("  Requests per minute:")
+    for key, count in sorted(mock.request_counts.items()):
+        print(f"    {key:<28} {count * 60 / duration:8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="late_join")
+    parser.add_argument("--duration", type=float, default=12)
+    parser.add_argument("--target", default="blue2")
+    parser.add_argument("--config", help="follower config.json to benchmark (defaults otherwise)")
+    parser.add_argument("--blue-offset", type=int, default=0, help="make the mock's blue slots differ from +6")
+    parser.add_argument("--instances", type=int, default=1, help="number of game clients to follow")
+    parser.add_argument("--multi", action="store_true", help="follow all instances from one --multi process")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+
+    mocks = [MockEchoVR(target=args.target, blue_offset=args.blue_offset) for _ in range(args.instances)]
+    servers = [mock.serve() for mock in mocks]
+    urls = [f"http://127.0.0.1:{server.server_port}" for server in servers]
+
+    if args.multi:
+        instances = [{"name": f"client{number}", "url": url, "player": args.target}
+                     for number, url in enumerate(urls, 1)]
+        runs = [(["--multi"], {"instances": instances})]
+    else:
+        runs = [(["--player", args.target, "--url", url], {}) for url in urls]
+
+    # Give the followers a moment to lock on before the scripted changes start
+    for mock in mocks:
+        mock.run_scenario([dict(step, at=step["at"] + 1) for step in SCENARIOS[args.scenario]])
+    cpu_seconds, memory_kb = run_followers(runs, args.duration, config)
+    for server in servers:
+        server.shutdown()
+
+    print(f"Scenario {args.scenario}, target {args.target}, {args.duration:g}s, "
+          f"{args.instances} client(s) in {len(runs)} process(es)")
+    for number, mock in enumerate(mocks, 1):
+        report(f"Client {number}", mock, args.duration)
+
+    print(f"Follower CPU: {cpu_seconds:.3f}s ({cpu_seconds * 100 / args.duration:.1f}% of one core)")
+    if memory_kb is not None:
+        print(f"Follower memory: {memory_kb / 1024:.1f} MiB resident")
+
+if __name__ == "__main__":
+    main()
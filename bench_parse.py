@@ -0,0 +1,79 @@
+"""Compare full json decoding of /session against the follower's field scanner
+
+Frames come from a --record recording, or from the mock API stepping through a
+scenario. Recordings store decoded frames, so each one is re-encoded the way the
+game sends it before timing.
+
+Usage: python bench_parse.py [--recording session.jsonl.gz] [--scenario chaos] [--rounds 200]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from mock_server import SCENARIOS, MockEchoVR
+from spectate import read_recording, scan_session
+
+def follower_fields(session_data):
+    """The part of a full frame the scanner is expected to return"""
+    teams = []
+    for team in session_data.get("teams", []):
+        entry = {"team": team["team"]}
+        if "players" in team:
+            entry["players"] = [{"name": player["name"], "head": {"position": player["head"]["position"]}}
+                                for player in team["players"]]
+        teams.append(entry)
+    fields = {"teams": teams}
+    if "sessionid" in session_data:
+        fields["sessionid"] = session_data["sessionid"]
+    if "player" in session_data:
+        fields["player"] = {"vr_position": session_data["player"]["vr_position"]}
+    return fields
+
+def mock_frames(scenario):
+    """One frame before and after each scenario step"""
+    mock = MockEchoVR()
+    frames = [mock.session_json()]
+    for step in SCENARIOS[scenario]:
+        if step["action"] in ("stall", "errors"):
+            continue
+        mock.apply(step)
+        frames.append(mock.session_json())
+    return frames
+
+def run(label, parse, payloads, rounds):
+    """Time parse over every payload and report per-frame cost and allocations"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for raw in payloads:
+            parse(raw)
+    per_frame = (time.perf_counter() - start) / (rounds * len(payloads))
+
+    tracemalloc.start()
+    kept = [parse(raw) for raw in payloads]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {per_frame * 1e6:8.1f} us/frame  {retained / len(kept):8.0f} B kept/frame  "
+          f"{peak / 1024:7.1f} KiB peak")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recording", help="a .jsonl.gz written by spectate.py --record")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="chaos")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = [data for _, data in read_recording(args.recording) if data]
+    else:
+        frames = mock_frames(args.scenario)
+    payloads = [json.dumps(frame).encode() for frame in frames]
+
+    mismatched = sum(scan_session(raw) != follower_fields(json.loads(raw)) for raw in payloads)
+    print(f"{len(payloads)} frames, {sum(map(len, payloads)) / len(payloads):.0f} bytes on average, "
+          f"{mismatched} where the scanner disagrees with a full decode")
+    run("json.loads", json.loads, payloads, args.rounds)
+    run("scan_session", scan_session, payloads, args.rounds)
+
+if __name__ == "__main__":
+    main()
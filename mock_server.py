@@ -0,0 +1,341 @@
+"""Scriptable stand-in for the Echo VR local API
+
+Serves /session, /camera_mode and the four UI visibility endpoints, and replays
+scenarios such as late joins, leaves, team swaps, possession changes, goals,
+stalls, 500 errors and new matches.
+
+Usage: python mock_server.py [--port 6721] [--scenario late_join | --scenario-file steps.json]
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+UI_ENDPOINTS = ("ui_visibility", "nameplates_visibility", "minimap_visibility", "enemy_team_muted")
+
+# Each step fires `at` seconds after the scenario starts
+SCENARIOS = {
+    "idle": [],
+    "late_join": [
+        {"at": 2, "action": "join", "team": "BLUE TEAM", "name": "blue_late", "index": 0},
+        {"at": 6, "action": "join", "team": "BLUE TEAM", "name": "blue_later", "index": 1},
+    ],
+    "leave": [
+        {"at": 2, "action": "leave", "name": "blue0"},
+        {"at": 6, "action": "leave", "name": "blue1"},
+    ],
+    "team_swap": [
+        {"at": 2, "action": "swap", "name": "blue0", "team": "ORANGE TEAM"},
+        {"at": 6, "action": "swap", "name": "orange0", "team": "BLUE TEAM", "index": 0},
+    ],
+    "spectate": [
+        {"at": 2, "action": "swap", "name": "blue2", "team": "SPECTATORS"},
+        {"at": 4, "action": "swap", "name": "blue2", "team": "BLUE TEAM", "index": 0},
+        {"at": 6, "action": "leave", "name": "blue2"},
+        {"at": 8, "action": "join", "team": "BLUE TEAM", "name": "blue2"},
+    ],
+    "stall": [
+        {"at": 2, "action": "stall", "seconds": 3},
+        {"at": 3, "action": "join", "team": "BLUE TEAM", "name": "blue_late", "index": 0},
+    ],
+    "errors": [
+        {"at": 2, "action": "errors", "seconds": 3},
+        {"at": 3, "action": "leave", "name": "blue0"},
+    ],
+    "director": [
+        {"at": 1, "action": "possession", "name": "blue0"},
+        {"at": 3, "action": "possession", "name": "blue2"},
+        {"at": 4, "action": "possession", "name": "blue1"},
+        {"at": 8, "action": "score", "name": "blue1", "seconds": 3},
+    ],
+    "chaos": [
+        {"at": 1, "action": "join", "team": "BLUE TEAM", "name": "blue_late", "index": 0},
+        {"at": 3, "action": "errors", "seconds": 1},
+        {"at": 5, "action": "swap", "name": "blue0", "team": "ORANGE TEAM", "index": 0},
+        {"at": 7, "action": "stall", "seconds": 2},
+        {"at": 8, "action": "leave", "name": "blue_late"},
+        {"at": 10, "action": "join", "team": "BLUE TEAM", "name": "blue_latest", "index": 1},
+    ],
+}
+
+def default_teams():
+    return {
+        "BLUE TEAM": [f"blue{i}" for i in range(3)],
+        "ORANGE TEAM": [f"orange{i}" for i in range(3)],
+        "SPECTATORS": [],
+    }
+
+class MockEchoVR:
+    """In-memory game state behind the mock API"""
+    def __init__(self, teams=None, target=None, blue_offset=0):
+        self.lock = threading.Lock()
+        self.blue_offset = blue_offset
+        self.teams = teams or default_teams()
+        self.target = target
+        self.camera = None
+        self.ui_settings = {endpoint: None for endpoint in UI_ENDPOINTS}
+        self.stall_until = 0
+        self.errors_until = 0
+        self.possession = None
+        self.scorer = None
+        self.score_until = 0
+        self.match_number = 0
+        self.request_counts = {}
+        self.events = []
+        self.wrong_since = None
+        self.wrong_cause = None
+        self.recoveries = []
+        self.started_at = time.monotonic()
+
+    def camera_for(self, team_name, player_index):
+        """Camera slot the game gives a player; blue_offset simulates slots the follower guesses wrong"""
+        if "ORANGE" in team_name:
+            return player_index + 1
+        return player_index + 6 + self.blue_offset
+
+    def player_on_camera(self, camera_index):
+        """Name of the player a POV camera shows, or None"""
+        for team_name, players in self.teams.items():
+            if team_name == "SPECTATORS":
+                continue
+            for player_index, name in enumerate(players):
+                if self.camera_for(team_name, player_index) == camera_index:
+                    return name
+        return None
+
+    def head_position(self, team_name, player_index):
+        side = -10 if "ORANGE" in team_name else 10
+        return [float(player_index), 1.5, float(side)]
+    
+    @staticmethod
+    def transform(position):
+        """Position plus orientation vectors, as the game reports heads, bodies and hands"""
+        return {"position": position, "forward": [0.0, 0.0, 1.0], "left": [1.0, 0.0, 0.0], "up": [0.0, 1.0, 0.0]}
+    
+    def player_json(self, name, player_index, position):
+        """One player entry with the same fields (and key order) as the game's /session"""
+        body = [position[0], position[1] - 0.6, position[2]]
+        return {
+            "name": name,
+            "rhand": self.transform([position[0] + 0.3, position[1] - 0.4, position[2]]),
+            "playerid": player_index,
+            "stats": {"possession_time": 0.0, "points": 0, "saves": 0, "goals": 0, "stuns": 0, "passes": 0,
+                      "catches": 0, "steals": 0, "blocks": 0, "interceptions": 0, "assists": 0, "shots_taken": 0},
+            "userid": zlib.crc32(name.encode()),
+            "number": player_index,
+            "level": 50,
+            "stunned": False,
+            "ping": 40,
+            "packetlossratio": 0.0,
+            "invulnerable": False,
+            "holding_left": "none",
+            "possession": name == self.possession,
+            "head": self.transform(position),
+            "body": self.transform(body),
+            "holding_right": "none",
+            "lhand": self.transform([position[0] - 0.3, position[1] - 0.4, position[2]]),
+            "blocking": False,
+            "velocity": [0.0, 0.0, 0.0],
+        }
+
+    def session_json(self):
+        """Build a /session payload for the current state"""
+        with self.lock:
+            teams = []
+            pov_position = [0.0, 0.0, 0.0]
+            disc_position = [0.0, 0.0, 0.0]
+            on_camera = self.player_on_camera(self.camera)
+            for team_name, players in self.teams.items():
+                team_players = []
+                for player_index, name in enumerate(players):
+                    position = self.head_position(team_name, player_index)
+                    if name == on_camera:
+                        pov_position = position
+                    if name == self.possession:
+                        disc_position = position
+                    team_players.append(self.player_json(name, player_index, position))
+                team = {"players": team_players, "team": team_name, "possession": False,
+                        "stats": {"points": 0, "possession_time": 0.0}}
+                if not team_players:
+                    # The game leaves "players" out of empty teams
+                    del team["players"]
+                teams.append(team)
+            game_status = "score" if time.monotonic() < self.score_until else "playing"
+            return {
+                "disc": dict(self.transform(disc_position), velocity=[0.0, 0.0, 0.0], bounce_count=0),
+                "sessionid": f"00000000-0000-0000-0000-{self.match_number:012d}",
+                "game_status": game_status,
+                "game_clock": 300.0,
+                "last_score": {"disc_speed": 0.0, "team": "blue", "goal_type": "[NO GOAL]", "point_amount": 0,
+                               "person_scored": self.scorer or "[INVALID]", "assist_scored": "[INVALID]"},
+                "player": {"vr_left": [1.0, 0.0, 0.0], "vr_position": pov_position,
+                           "vr_forward": [0.0, 0.0, 1.0], "vr_up": [0.0, 1.0, 0.0]},
+                "teams": teams,
+                "client_name": "spectator",
+                "map_name": "mpl_arena_a",
+            }
+
+    def track_target(self, cause):
+        """Record how long the camera spent off the target; call with the lock held"""
+        if not self.target:
+            return
+        now = time.monotonic()
+        on_target = self.player_on_camera(self.camera) == self.target
+        if on_target and self.wrong_since is not None:
+            self.recoveries.append((self.wrong_cause, now - self.wrong_since))
+            self.wrong_since = None
+        elif not on_target and self.wrong_since is None:
+            self.wrong_since = now
+            self.wrong_cause = cause
+
+    def set_camera(self, camera_index):
+        with self.lock:
+            self.camera = camera_index
+            self.track_target("camera_mode")
+
+    def set_ui(self, endpoint, visible):
+        with self.lock:
+            self.ui_settings[endpoint] = visible
+
+    def count(self, key):
+        with self.lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def apply(self, step):
+        """Apply one scenario step"""
+        action = step["action"]
+        with self.lock:
+            now = time.monotonic()
+            if action == "join":
+                players = self.teams.setdefault(step["team"], [])
+                players.insert(step.get("index", len(players)), step["name"])
+            elif action == "leave":
+                for players in self.teams.values():
+                    if step["name"] in players:
+                        players.remove(step["name"])
+            elif action == "swap":
+                for players in self.teams.values():
+                    if step["name"] in players:
+                        players.remove(step["name"])
+                players = self.teams.setdefault(step["team"], [])
+                players.insert(step.get("index", len(players)), step["name"])
+            elif action == "possession":
+                self.possession = step["name"]
+            elif action == "score":
+                self.scorer = step["name"]
+                self.score_until = now + step.get("seconds", 5)
+            elif action == "stall":
+                self.stall_until = now + step["seconds"]
+            elif action == "errors":
+                self.errors_until = now + step["seconds"]
+            elif action == "new_match":
+                # The game resets UI settings when a new session starts
+                self.match_number += 1
+                self.ui_settings = {endpoint: None for endpoint in UI_ENDPOINTS}
+            else:
+                raise ValueError(f"Unknown scenario action: {action}")
+            self.events.append((now - self.started_at, step))
+            self.track_target(f"{action} {step.get('name', '')}".strip())
+
+    def run_scenario(self, steps):
+        """Replay steps on a background thread"""
+        def runner():
+            start = time.monotonic()
+            for step in sorted(steps, key=lambda step: step["at"]):
+                time.sleep(max(0, start + step["at"] - time.monotonic()))
+                self.apply(step)
+        thread = threading.Thread(target=runner, daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, host="127.0.0.1", port=0):
+        """Start the HTTP server on a background thread and return it"""
+        server = ThreadingHTTPServer((host, port), make_handler(self))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def make_handler(mock):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without this, delayed ACKs stall keep-alive
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, status, body=b"{}"):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def degraded(self):
+            """Apply any scripted stall, and report whether to answer with a 500"""
+            stall = mock.stall_until - time.monotonic()
+            if stall > 0:
+                time.sleep(stall)
+            return time.monotonic() < mock.errors_until
+
+        def do_GET(self):
+            endpoint = self.path.strip("/")
+            mock.count(f"GET /{endpoint}")
+            if self.degraded():
+                return self.reply(500)
+            if endpoint != "session":
+                return self.reply(404)
+            self.reply(200, json.dumps(mock.session_json()).encode())
+
+        def do_POST(self):
+            endpoint = self.path.strip("/")
+            mock.count(f"POST /{endpoint}")
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except ValueError:
+                return self.reply(400)
+            if self.degraded():
+                return self.reply(500)
+            if endpoint == "camera_mode":
+                mock.set_camera(payload.get("num"))
+            elif endpoint in UI_ENDPOINTS:
+                mock.set_ui(endpoint, payload.get("visible"))
+            else:
+                return self.reply(404)
+            self.reply(200)
+
+    return MockHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6721)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="idle")
+    parser.add_argument("--scenario-file", help="JSON list of steps, overrides --scenario")
+    parser.add_argument("--target", help="player whose camera recoveries are reported on exit")
+    parser.add_argument("--blue-offset", type=int, default=0, help="shift blue camera slots from the usual +6")
+    args = parser.parse_args()
+
+    steps = SCENARIOS[args.scenario]
+    if args.scenario_file:
+        with open(args.scenario_file) as f:
+            steps = json.load(f)
+
+    mock = MockEchoVR(target=args.target, blue_offset=args.blue_offset)
+    server = mock.serve(args.host, args.port)
+    mock.run_scenario(steps)
+    print(f"Mock Echo VR API on http://{args.host}:{server.server_port} ({len(steps)} scenario steps)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Requests: {mock.request_counts}")
+        if args.target:
+            for cause, seconds in mock.recoveries:
+                print(f"Camera back on {args.target} {seconds:.3f}s after {cause}")
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,2049 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import threading
+import asyncio
+import queue
 import time
+import random
+import argparse
+import logging
+import signal
+import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import gzip
 import os
+import re
+import cProfile
+import collections
+import copy
+import base64
+import hashlib
+import struct
+import zlib
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-class EchoVRFollowMe:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Echo VR Camera Follower")
-        self.root.geometry("400x600")
-        self.root.resizable(False, False)
+# Tkinter is imported on first GUI use so headless runs never pay for it
+tk = None
+
+log = logging.getLogger("spectate")
+
+def import_tk():
+    """Import Tkinter on demand"""
+    global tk
+    if tk is None:
+        import tkinter
+        tk = tkinter
+    return tk
+
+CONFIG_VERSION = 2
+
+def migrate_config_v1(config):
+    """v1 was unversioned and may lack the keys it only wrote once used"""
+    config.setdefault("corrections", {})
+    config.setdefault("last_username", "")
+    return config
+
+# Index i upgrades a config from version i + 1 to i + 2
+CONFIG_MIGRATIONS = [migrate_config_v1]
+
+class ConfigStore:
+    """config.json with schema migration and debounced, atomic saves
+    
+    save() serializes the config straight away, so it must be called on the thread
+    that changes the config (the engine thread once there is one), and schedules the
+    write; bursts of changes inside the debounce window become one write. flush()
+    writes the last snapshot immediately and must be called on exit.
+    """
+    def __init__(self, path, debounce=1.0):
+        self.path = path
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.timer = None
+        self.pending = None
+        self.data = self.load()
+    
+    def load(self):
+        """Load configuration from file"""
+        config = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                # Keep the unreadable file around instead of silently losing corrections
+                print(f"Failed to load config, moving it to {self.path}.bad: {e}")
+                try:
+                    os.replace(self.path, self.path + ".bad")
+                except OSError:
+                    pass
+                config = {}
+        return self.migrate(config)
+    
+    @staticmethod
+    def migrate(config):
+        """Upgrade an older config dict to CONFIG_VERSION"""
+        version = config.get("version", 1)
+        if version > CONFIG_VERSION:
+            # Written by a newer release; keep its version so saving does not relabel it
+            print(f"Config version {version} is newer than {CONFIG_VERSION}; unknown settings are kept as they are")
+            return config
+        for migration in CONFIG_MIGRATIONS[version - 1:]:
+            config = migration(config)
+        config["version"] = CONFIG_VERSION
+        return config
+    
+    def save(self):
+        """Snapshot the config and schedule a write after the debounce window"""
+        text = json.dumps(self.data, indent=2)
+        with self.lock:
+            self.pending = text
+            if self.timer is None:
+                self.timer = threading.Timer(self.debounce, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+    
+    def flush(self):
+        """Write now: temp file, fsync, then rename over the old file"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.pending is None:
+                return
+            
+            temp_path = self.path + ".tmp"
+            try:
+                with open(temp_path, 'w') as f:
+                    f.write(self.pending)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+                self.pending = None
+            except Exception as e:
+                print(f"Failed to save config: {e}")
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms in Prometheus text format"""
+    LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.last_rate_check = (time.monotonic(), 0)
+    
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+    
+    def inc(self, name, amount=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self.key(name, labels)] = value
+    
+    def observe(self, name, seconds, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * len(self.LATENCY_BUCKETS), 0.0, 0]
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+    
+    def total(self, name):
+        """Sum a counter across all its labels"""
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+    
+    def quantile(self, name, q, **labels):
+        """Upper bucket bound containing the q-quantile, or None without samples"""
+        with self.lock:
+            histogram = self.histograms.get(self.key(name, labels))
+            if not histogram or not histogram[2]:
+                return None
+            wanted = q * histogram[2]
+            for bound, count in zip(self.LATENCY_BUCKETS, histogram[0]):
+                if count >= wanted:
+                    return bound
+            return float("inf")
+    
+    def summary(self):
+        """One-line stats for the status card and logs"""
+        now = time.monotonic()
+        polls = self.total("follower_polls_total")
+        last_time, last_polls = self.last_rate_check
+        self.last_rate_check = (now, polls)
+        rate = (polls - last_polls) / (now - last_time) if now > last_time else 0
         
-        self.bg_color = "#2b2b2b"
-        self.card_color = "#3c3f41"
-        self.accent_color = "#4a9cff"
-        self.text_color = "#ffffff"
-        self.subtle_text = "#aaaaaa"
+        def ms(value):
+            return "--" if value is None else f"<{value * 1000:g}"
         
-        self.root.configure(bg=self.bg_color)
+        p50 = self.quantile("echovr_request_seconds", 0.5, endpoint="session")
+        p95 = self.quantile("echovr_request_seconds", 0.95, endpoint="session")
+        return (f"{rate:.1f} polls/s, /session p50 {ms(p50)} ms p95 {ms(p95)} ms, "
+                f"{self.total('echovr_errors_total') + self.total('follower_loop_errors_total'):g} errors, "
+                f"{self.total('follower_camera_switches_total'):g} switches")
+    
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+    
+    def render(self):
+        """Render everything in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{name}{self.format_labels(labels)} {value:g}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, labels), (buckets, total, count) in sorted(self.histograms.items()):
+                    if series_name != name:
+                        continue
+                    for bound, bucket_count in zip(self.LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{self.format_labels(labels, [('le', f'{bound:g}')])} {bucket_count}")
+                    lines.append(f"{name}_bucket{self.format_labels(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{self.format_labels(labels)} {total:g}")
+                    lines.append(f"{name}_count{self.format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """Serve metrics.render() at /metrics on a background thread"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+        
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class EchoVRClient:
+    """Keep-alive HTTP client for the local Echo VR API"""
+    DEFAULT_TIMEOUTS = {"default": 2, "session": 2, "camera_mode": 2}
+    
+    def __init__(self, base_url="http://127.0.0.1:6721", pool_size=4, retries=1, timeouts=None, metrics=None,
+                 http=None):
+        self.base_url = base_url
+        self.metrics = metrics or Metrics()
+        self.timeouts = dict(self.DEFAULT_TIMEOUTS, **(timeouts or {}))
+        # A shared session (see make_session) stays open until its owner closes it
+        self.owns_http = http is None
+        self.http = http or self.make_session(pool_size, retries)
+    
+    @staticmethod
+    def make_session(pool_size=4, retries=1, hosts=1):
+        """requests session with keep-alive pools for `hosts` game clients"""
+        # Only connection failures are retried; a slow game API should not be hit twice
+        retry = Retry(total=retries, connect=retries, read=0, status=0, backoff_factor=0.05)
+        adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size, max_retries=retry)
+        http = requests.Session()
+        http.mount("http://", adapter)
+        return http
+    
+    def timeout_for(self, endpoint):
+        """Get the configured timeout for an endpoint"""
+        return self.timeouts.get(endpoint, self.timeouts["default"])
+    
+    def get_json(self, endpoint, parse=None):
+        """GET an endpoint and return its JSON body, or None on failure
+        
+        parse, if given, turns the raw body bytes into the result instead of a full json decode.
+        """
+        started = time.perf_counter()
+        try:
+            response = self.http.get(f"{self.base_url}/{endpoint}", timeout=self.timeout_for(endpoint))
+            self.metrics.observe("echovr_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            if response.status_code == 200:
+                decode_started = time.perf_counter()
+                data = parse(response.content) if parse else response.json()
+                self.metrics.observe("echovr_decode_seconds", time.perf_counter() - decode_started, endpoint=endpoint)
+                return data
+            self.metrics.inc("echovr_errors_total", endpoint=endpoint, type=f"http_{response.status_code}")
+            return None
+        except Exception as e:
+            self.metrics.inc("echovr_errors_total", endpoint=endpoint, type=type(e).__name__)
+            return None
+    
+    def post_json(self, endpoint, payload):
+        """POST a JSON payload and report whether the game accepted it"""
+        started = time.perf_counter()
+        try:
+            response = self.http.post(f"{self.base_url}/{endpoint}", json=payload,
+                                      timeout=self.timeout_for(endpoint))
+            self.metrics.observe("echovr_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            if response.status_code != 200:
+                self.metrics.inc("echovr_errors_total", endpoint=endpoint, type=f"http_{response.status_code}")
+            return response.status_code == 200
+        except Exception as e:
+            self.metrics.inc("echovr_errors_total", endpoint=endpoint, type=type(e).__name__)
+            return False
+    
+    async def get_json_async(self, endpoint, parse=None):
+        """Coroutine form of get_json; cancelling it abandons the request immediately"""
+        return await asyncio.to_thread(self.get_json, endpoint, parse)
+    
+    async def post_json_async(self, endpoint, payload):
+        """Coroutine form of post_json; cancelling it abandons the request immediately"""
+        return await asyncio.to_thread(self.post_json, endpoint, payload)
+    
+    def close(self):
+        """Close pooled connections"""
+        if self.owns_http:
+            self.http.close()
+
+class EngineThread:
+    """Event loop on a background thread that runs all API coroutines"""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+    
+    def submit(self, coro):
+        """Schedule a coroutine from any thread and return its future"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self.report_failure)
+        return future
+    
+    @staticmethod
+    def report_failure(future):
+        """Print exceptions that would otherwise vanish with an unawaited future"""
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Engine task failed: {future.exception()!r}")
+    
+    def stop(self):
+        """Stop the event loop"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+CLAN_TAG = re.compile(r"[\[\(\{<][^\]\)\}>]*[\]\)\}>]")
+
+def normalize_name(name):
+    """Casefold a player name and drop clan tags and whitespace"""
+    folded = name.casefold()
+    stripped = "".join(CLAN_TAG.sub("", folded).split())
+    return stripped or "".join(folded.split())
+
+def is_spectator_team(team_name):
+    """Whether a team is the game's spectator list, which has no POV cameras"""
+    return "SPECTATOR" in team_name.upper()
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class PlayerIndex:
+    """Name index over the session roster, rebuilt only when the roster changes
+    
+    Entries are keyed by the casefolded in-game name; the normalized name (no clan
+    tags or whitespace) maps to every key that shares it, so players who only differ
+    by tag stay apart.
+    """
+    def __init__(self):
+        self.roster_key = None
+        self.entries = {}
+        self.names = {}
+        self.normalized = {}
+        self.normalized_cache = {}
+    
+    def normalize(self, name):
+        """Normalize a name, reusing the work done for names on the current roster"""
+        normalized = self.normalized_cache.get(name)
+        return normalized if normalized is not None else normalize_name(name)
+    
+    def update(self, session_data):
+        """Re-index if the team/player layout differs from the last call"""
+        teams = (session_data or {}).get("teams", [])
+        roster_key = tuple((team.get("team", "Unknown"), tuple(player.get("name", "Unknown") for player in team.get("players", [])))
+                           for team in teams)
+        if roster_key == self.roster_key:
+            return False
+        
+        entries = {}
+        names = {}
+        normalized = {}
+        # Only roster names are cached, so typed queries never grow the cache
+        normalized_cache = {}
+        for team_name, player_names in roster_key:
+            for player_index, player_name in enumerate(player_names):
+                if is_spectator_team(team_name):
+                    camera_index = None
+                elif "ORANGE" in team_name.upper():
+                    camera_index = player_index + 1
+                else:
+                    camera_index = player_index + 6
+                key = player_name.casefold()
+                normalized_cache[player_name] = self.normalize(player_name)
+                entries[key] = (team_name, player_index, camera_index)
+                names[key] = player_name
+                normalized.setdefault(normalized_cache[player_name], []).append(key)
+        
+        # Swap whole dicts so readers on other threads never see a half-built index
+        self.entries, self.names, self.normalized = entries, names, normalized
+        self.normalized_cache, self.roster_key = normalized_cache, roster_key
+        return True
+    
+    def key_for(self, player_name):
+        """Get the index key for an exact name, ignoring case, or ignoring tags if that is unambiguous"""
+        folded = player_name.casefold()
+        if folded in self.entries:
+            return folded
+        keys = self.normalized.get(self.normalize(player_name), [])
+        return keys[0] if len(keys) == 1 else None
+    
+    def resolve(self, query):
+        """Get the in-game name best matching a typed name, or None if ambiguous or absent"""
+        key = self.key_for(query)
+        if key:
+            return self.names[key]
+        
+        wanted = self.normalize(query)
+        if not wanted:
+            return None
+        prefixed = [key for normalized, keys in self.normalized.items() if normalized.startswith(wanted) for key in keys]
+        if len(prefixed) == 1:
+            return self.names[prefixed[0]]
+        
+        limit = max(1, len(wanted) // 4)
+        scored = sorted((edit_distance(wanted, normalized, limit), key)
+                        for normalized, keys in self.normalized.items() for key in keys)
+        scored = [item for item in scored if item[0] <= limit]
+        if scored and (len(scored) == 1 or scored[0][0] < scored[1][0]):
+            return self.names[scored[0][1]]
+        return None
+    
+    def suggestions(self, prefix, limit=5):
+        """Get in-game names for autocomplete, prefix matches first"""
+        wanted = self.normalize(prefix)
+        if not wanted:
+            return []
+        starts = sorted(self.names[key] for normalized, keys in self.normalized.items()
+                        if normalized.startswith(wanted) for key in keys)
+        contains = sorted(self.names[key] for normalized, keys in self.normalized.items()
+                          if wanted in normalized and not normalized.startswith(wanted) for key in keys)
+        return (starts + contains)[:limit]
+
+# Keys the follower reads from /session, with the value shapes it expects. Numeric arrays
+# are captured whole; "teams"/"players" only match their opening bracket.
+SESSION_FIELDS = re.compile(rb'"(teams|team|players|name|head|vr_position|sessionid)"\s*:\s*(?:'
+                            rb'"([^"\\]*(?:\\.[^"\\]*)*)"'
+                            rb'|\{[^{}]*?"position"\s*:\s*\[([^\]\[]*)\]'
+                            rb'|\[(?:([^\]\[{}"]*)\])?)')
+NOT_BRACKETS = bytes(set(range(256)) - set(b"[]{}"))
+
+def bracket_depth(fragment):
+    """Net nesting change of a JSON fragment that has no brackets inside its strings"""
+    brackets = fragment.translate(None, NOT_BRACKETS)
+    return brackets.count(b"{") + brackets.count(b"[") - brackets.count(b"}") - brackets.count(b"]")
+
+def lowest_depth(depth, fragment):
+    """Lowest nesting depth reached while walking such a fragment"""
+    lowest = depth
+    for bracket in fragment.translate(None, NOT_BRACKETS):
+        if bracket in b"{[":
+            depth += 1
+        else:
+            depth -= 1
+            if depth < lowest:
+                lowest = depth
+    return lowest
+
+def json_text(escaped):
+    """Decode the inside of a JSON string literal"""
+    return json.loads(b'"' + escaped + b'"') if b"\\" in escaped else escaped.decode("utf-8")
+
+def json_numbers(inner):
+    """Decode the inside of a flat JSON number array"""
+    return list(map(float, inner.split(b","))) if inner.strip() else []
+
+def scan_session(raw):
+    """Pull only the fields the follower uses out of a raw /session body
+    
+    Returns a dict shaped like the full payload but holding just team names, player names,
+    head positions, player.vr_position and the sessionid, without decoding the stats, hands, disc and
+    velocity data that make up most of each frame. Nesting is only worked out at
+    team-level keys, by counting brackets since the last one; this relies on player names
+    being the only strings in the teams array that may contain brackets, and on "name" and
+    "head" only appearing in player objects. Anything unexpected falls back to json.loads.
+    """
+    try:
+        session = scan_fields(raw)
+    except ValueError:
+        session = None
+    return session if session is not None else json.loads(raw)
+
+def scan_fields(raw):
+    """Scanner behind scan_session; returns None when the payload is not laid out as expected"""
+    session = {}
+    teams = team = player = None
+    closed = False
+    # depth is known at `position`; `skew` undoes brackets inside names matched since then
+    depth = position = skew = last_end = 0
+    for match in SESSION_FIELDS.finditer(raw):
+        key, string, head, array = match.groups()
+        if key == b"vr_position" and array is not None:
+            session["player"] = {"vr_position": json_numbers(array)}
+            continue
+        if key == b"sessionid" and string is not None:
+            session["sessionid"] = json_text(string)
+            continue
+        if closed:
+            continue
+        if teams is None:
+            if key == b"teams" and string is None and head is None:
+                teams = session["teams"] = []
+                closed = array is not None
+                depth = 1
+                position = last_end = match.end()
+            continue
+        
+        if key in (b"name", b"head"):
+            if team is None:
+                continue
+            field = "name" if key == b"name" else "head"
+            if player is None or field in player:
+                # Each player object has one name and one head, in whatever order the game writes them
+                player = {}
+                team.setdefault("players", []).append(player)
+            if key == b"name" and string is not None:
+                player["name"] = json_text(string)
+                skew += bracket_depth(string)
+            elif key == b"head" and head is not None:
+                player["head"] = {"position": json_numbers(head)}
+            last_end = match.end()
+            continue
+        
+        # Depth at the end of the previous match, then walk the plain JSON since it
+        previous_depth = depth + bracket_depth(raw[position:last_end]) - skew
+        lowest = lowest_depth(previous_depth, raw[last_end:match.start()])
+        if lowest <= 0:
+            # The teams array ended somewhere in between; nothing after it is ours
+            closed = True
+            continue
+        depth = previous_depth + bracket_depth(raw[last_end:match.start()])
+        position = last_end = match.end()
+        skew = 0
+        if lowest <= 1:
+            # Walked back out to the teams array, so this key is in the next team object
+            team = player = None
+        if depth != 2:
+            continue
+        
+        if team is None:
+            team = {}
+            teams.append(team)
+        if key == b"team" and string is not None:
+            team["team"] = json_text(string)
+        elif key == b"players" and string is None and head is None:
+            team["players"] = []
+            player = None
+        if string is None and array is None:
+            depth += 1
+    
+    if not closed and teams is not None:
+        previous_depth = depth + bracket_depth(raw[position:last_end]) - skew
+        closed = lowest_depth(previous_depth, raw[last_end:]) <= 0
+    if not closed or any("team" not in team for team in teams):
+        return None
+    return session
+
+class SessionSnapshot:
+    """Single parsed copy of /session shared by every lookup in a polling tick"""
+    def __init__(self, fetch, ttl=0.5, metrics=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.metrics = metrics or Metrics()
+        self.data = None
+        self.fetched_at = None
+        self.index = PlayerIndex()
+        self.players = {}
+    
+    def is_fresh(self):
+        """Check whether the cached session is still within its TTL"""
+        if self.fetched_at is None:
+            return False
+        return time.monotonic() - self.fetched_at < self.ttl
+    
+    async def refresh(self, force=False):
+        """Fetch and parse /session unless the cached copy is still fresh"""
+        if force or not self.is_fresh():
+            self.data = await self.fetch()
+            self.fetched_at = time.monotonic()
+            index_started = time.perf_counter()
+            if self.index.update(self.data):
+                self.metrics.inc("follower_roster_rebuilds_total")
+            self.players = self.index.entries
+            self.metrics.observe("follower_index_seconds", time.perf_counter() - index_started)
+        return self.data
+    
+    async def lookup(self, player_name, force=False):
+        """Get (team, slot, camera) for a player, or None if not in the match
+        
+        The camera is None for spectators.
+        """
+        await self.refresh(force)
+        return self.entry(player_name)
+    
+    def entry(self, player_name):
+        """Get (team, slot, camera) from the cached session without refreshing"""
+        key = self.index.key_for(player_name)
+        return self.players.get(key) if key else None
+    
+    @staticmethod
+    def diff_rosters(previous, current):
+        """Compare two player indexes and return (joined, left, moved) name lists"""
+        joined = [name for name in current if name not in previous]
+        left = [name for name in previous if name not in current]
+        moved = [name for name in current if name in previous and current[name] != previous[name]]
+        return joined, left, moved
+    
+    def pov_position(self):
+        """Get the POV camera position, or None if the session does not report it"""
+        return (self.data or {}).get("player", {}).get("vr_position")
+    
+    def pov_player(self, max_distance=0.5):
+        """Get the index key of the player whose head the POV camera sits on, or None if unknown"""
+        data = self.data or {}
+        camera_position = self.pov_position()
+        if not camera_position:
+            return None
+        
+        nearest = None
+        nearest_distance = max_distance
+        for team in data.get("teams", []):
+            if is_spectator_team(team.get("team", "")):
+                continue
+            for player in team.get("players", []):
+                head_position = player.get("head", {}).get("position")
+                if not head_position:
+                    continue
+                distance = sum((a - b) ** 2 for a, b in zip(camera_position, head_position)) ** 0.5
+                if distance <= nearest_distance:
+                    nearest = player.get("name", "")
+                    nearest_distance = distance
+        return self.index.key_for(nearest) if nearest is not None else None
+
+def team_cameras(team_name):
+    """POV camera slots the game gives a team"""
+    if is_spectator_team(team_name):
+        return range(0)
+    return range(1, 6) if "ORANGE" in team_name.upper() else range(6, 11)
+
+class SlotVerifier:
+    """Learns which POV camera slot shows which player for the current roster
+    
+    The static slot from the roster is only a first guess. After a switch the POV
+    position is read back from the session; whoever the camera sits on is recorded
+    for that slot, and a wrong guess is retried with the offset seen for teammates.
+    When the roster changes the slots are forgotten, but each team's verified offset
+    from its static slots carries over as the prediction for the new roster, with
+    the slot a player was on before as the one to roll back to. A slot picked by hand
+    is pinned: it is not checked against the POV until the roster changes, only
+    watched for the game moving the camera off the player it first showed.
+    """
+    def __init__(self):
+        self.roster_key = None
+        self.entries = {}
+        self.cameras = {}
+        self.ruled_out = {}
+        self.offsets = {}
+        self.fallbacks = {}
+        self.pinned = {}
+    
+    def sync(self, index):
+        """Forget the mapping if the roster changed; return True if it did"""
+        if index.roster_key == self.roster_key:
+            return False
+        for key, camera_index in self.cameras.items():
+            entry = self.entries.get(key)
+            if entry and entry[2] is not None:
+                self.offsets[entry[0]] = camera_index - entry[2]
+        self.roster_key = index.roster_key
+        self.entries = index.entries
+        self.cameras = {}
+        self.ruled_out = {}
+        self.fallbacks = {}
+        self.pinned = {}
+        return True
+    
+    def learn(self, key, camera_index):
+        """Record that a camera slot shows a player"""
+        for other, other_camera in list(self.cameras.items()):
+            if other_camera == camera_index and other != key:
+                del self.cameras[other]
+                self.rule_out(other, camera_index)
+        self.cameras[key] = camera_index
+    
+    def pin(self, key, camera_index):
+        """Record a slot chosen by hand, trusted over what the POV shows"""
+        self.learn(key, camera_index)
+        self.pinned[key] = None
+    
+    def is_pinned(self, key):
+        return key in self.pinned
+    
+    def pinned_moved(self, key, shown):
+        """Note who a pinned slot shows; True once it shows someone else than at first"""
+        if self.pinned[key] is None:
+            self.pinned[key] = shown
+        return shown != self.pinned[key]
+    
+    def rule_out(self, key, camera_index):
+        """Record that a camera slot does not show a player"""
+        self.ruled_out.setdefault(key, set()).add(camera_index)
+    
+    def predict(self, key, previous_camera):
+        """Remember the slot a player was shown on before the roster changed"""
+        self.fallbacks[key] = previous_camera
+    
+    def is_verified(self, key):
+        return key in self.cameras
+    
+    def is_predicted(self, key):
+        """Whether a player's slot for this roster is still an unconfirmed prediction"""
+        return key in self.fallbacks and key not in self.cameras
+    
+    def camera_for(self, snapshot, key, guess):
+        """Get the verified camera for a player, or the best untried guess"""
+        self.sync(snapshot.index)
+        if key in self.cameras:
+            return self.cameras[key]
+        
+        entry = snapshot.players.get(key)
+        if not entry:
+            return guess
+        team_name = entry[0]
+        if team_name in self.offsets:
+            guess = entry[2] + self.offsets[team_name]
+        
+        # Teammates usually share one offset from their static slots
+        for other, camera_index in self.cameras.items():
+            other_entry = snapshot.players.get(other)
+            if other_entry and other_entry[0] == team_name:
+                guess = entry[2] + camera_index - other_entry[2]
+                break
+        
+        taken = set(self.cameras.values()) | self.ruled_out.get(key, set())
+        for candidate in (guess, self.fallbacks.get(key)):
+            if candidate is not None and candidate not in taken:
+                return candidate
+        untried = [camera_index for camera_index in team_cameras(team_name) if camera_index not in taken]
+        return untried[0] if untried else guess
+
+class PollScheduler:
+    """Picks the delay before the next /session poll from recent activity and API health"""
+    def __init__(self, burst_interval=0.15, idle_interval=1.0, burst_duration=3.0,
+                 backoff_initial=1.0, backoff_max=30.0):
+        self.burst_interval = burst_interval
+        self.idle_interval = idle_interval
+        self.burst_duration = burst_duration
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.burst_until = 0
+        self.failures = 0
+    
+    def burst(self):
+        """Poll fast for a while after a change or a manual action"""
+        self.burst_until = time.monotonic() + self.burst_duration
+    
+    def record_success(self):
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+    
+    def mode(self):
+        """Get the current scheduling mode: backoff, burst or idle"""
+        if self.failures:
+            return "backoff"
+        if time.monotonic() < self.burst_until:
+            return "burst"
+        return "idle"
+    
+    def next_delay(self):
+        """Get seconds to wait before the next poll"""
+        mode = self.mode()
+        if mode == "backoff":
+            # Full jitter keeps several followers from retrying a restarting game in lockstep
+            ceiling = min(self.backoff_max, self.backoff_initial * 2 ** (self.failures - 1))
+            return random.uniform(self.backoff_initial / 2, ceiling)
+        if mode == "burst":
+            return self.burst_interval
+        return self.idle_interval
+    
+    def describe(self):
+        """Summarize the configured rates for the status card"""
+        return (f"burst {self.burst_interval * 1000:.0f} ms for {self.burst_duration:g}s, "
+                f"idle {self.idle_interval * 1000:.0f} ms, backoff up to {self.backoff_max:g}s")
+    
+    def scale(self, factor):
+        """Multiply every interval, e.g. to speed up a replay"""
+        self.burst_interval *= factor
+        self.idle_interval *= factor
+        self.burst_duration *= factor
+        self.backoff_initial *= factor
+        self.backoff_max *= factor
+
+def diff_json(old, new):
+    """Return a compact delta that turns old into new, or None if they are equal
+    
+    Deltas are ["=", value] (replace), ["d", {key: delta}, removed_keys] (dict patch)
+    or ["l", {index: delta}] (patch of a list with unchanged length).
+    """
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            delta = diff_json(old[key], value) if key in old else ["=", value]
+            if delta is not None:
+                changes[key] = delta
+        removed = [key for key in old if key not in new]
+        return ["d", changes, removed] if removed else ["d", changes]
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = {}
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            delta = diff_json(old_item, new_item)
+            if delta is not None:
+                changes[str(index)] = delta
+        return ["l", changes]
+    return ["=", new]
+
+def patch_json(old, delta):
+    """Apply a diff_json delta; unchanged subtrees are shared with old"""
+    if delta is None:
+        return old
+    kind = delta[0]
+    if kind == "=":
+        return delta[1]
+    if kind == "d":
+        result = dict(old)
+        for key, value_delta in delta[1].items():
+            result[key] = patch_json(old.get(key), value_delta)
+        for key in delta[2] if len(delta) > 2 else ():
+            result.pop(key, None)
+        return result
+    result = list(old)
+    for index, item_delta in delta[1].items():
+        result[int(index)] = patch_json(old[int(index)], item_delta)
+    return result
+
+class SessionRecorder:
+    """Append-only, gzip-compressed log of every /session frame the follower sees
+    
+    Each line is {"t": seconds since the segment header, "p": delta from the previous frame};
+    "p" is omitted when nothing changed. Appending to an existing file starts a new segment.
+    A file left truncated by a crash cannot be appended to (nothing after the damage
+    would be readable), so it is moved aside to <path>.<time>.partial first.
+    """
+    def __init__(self, path, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        if os.path.exists(path) and not recording_is_complete(path):
+            partial_path = f"{path}.{int(time.time())}.partial"
+            os.replace(path, partial_path)
+            log.warning("Recording %s was cut short; moved it to %s and starting a new file", path, partial_path)
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        self.started_at = time.monotonic()
+        self.last_flush = self.started_at
+        self.previous = None
+        self.write({"v": 1, "started": time.time()})
+    
+    def write(self, entry):
+        self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+    
+    def record(self, session_data):
+        """Append one frame as a delta against the last one"""
+        now = time.monotonic()
+        entry = {"t": round(now - self.started_at, 3)}
+        delta = diff_json(self.previous, session_data) if self.previous is not None else ["=", session_data]
+        if delta is not None:
+            entry["p"] = delta
+        self.write(entry)
+        self.previous = session_data
+        
+        # A sync flush per second bounds what a crash can lose without hurting compression much
+        if now - self.last_flush >= self.flush_interval:
+            self.file.flush()
+            self.last_flush = now
+    
+    def close(self):
+        self.file.close()
+
+# What reading a recording that was not closed cleanly ends with
+TRUNCATED_RECORDING_ERRORS = (EOFError, zlib.error, gzip.BadGzipFile)
+
+def recording_is_complete(path):
+    """Check that a recording decompresses to the end"""
+    try:
+        with gzip.open(path, "rb") as f:
+            while f.read(1 << 20):
+                pass
+    except TRUNCATED_RECORDING_ERRORS:
+        return False
+    return True
+
+def read_recording(path):
+    """Yield (unix_time, session_data) for every frame in a recording
+    
+    A recording cut short by a crash is read up to the last complete line.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        started = 0
+        previous = None
+        lines = iter(f)
+        while True:
+            try:
+                line = next(lines)
+                entry = json.loads(line)
+            except StopIteration:
+                return
+            except TRUNCATED_RECORDING_ERRORS + (ValueError,):
+                log.warning("Recording %s ends early; it was probably not closed cleanly", path)
+                return
+            if "v" in entry:
+                started = entry["started"]
+                previous = None
+                continue
+            if "p" in entry:
+                previous = patch_json(previous, entry["p"])
+            yield started + entry["t"], previous
+
+class ReplayClient:
+    """Stands in for EchoVRClient and serves /session frames from a recording
+    
+    With speed 0 every poll gets the next frame; otherwise frames are served on a
+    clock running `speed` times faster than real time. Camera commands are logged.
+    """
+    def __init__(self, path, speed=0):
+        self.frames = read_recording(path)
+        self.speed = speed
+        self.current = next(self.frames, None)
+        self.upcoming = next(self.frames, None)
+        self.started_at = None
+        self.origin = None
+        self.frames_served = 0
+        self.commands = []
+        self.replay_time = 0.0
+        self.on_finished = lambda: None
+    
+    def advance(self):
+        self.current, self.upcoming = self.upcoming, next(self.frames, None)
+    
+    def next_session(self):
+        """Get the frame that is current on the replay clock"""
+        if self.current is None:
+            self.on_finished()
+            return None
+        
+        if self.speed:
+            now = time.monotonic()
+            if self.started_at is None:
+                self.started_at = now
+                self.origin = self.current[0]
+            replay_time = self.origin + (now - self.started_at) * self.speed
+            while self.upcoming is not None and self.upcoming[0] <= replay_time:
+                self.advance()
+            frame = self.current
+            if self.upcoming is None:
+                self.advance()
+        else:
+            frame = self.current
+            replay_time = frame[0]
+            self.advance()
+        
+        self.replay_time = replay_time
+        self.frames_served += 1
+        return frame[1]
+    
+    def clock(self):
+        """Time on the replay clock, so the follower's timing follows the recording"""
+        return self.replay_time
+    
+    def get_json(self, endpoint, parse=None):
+        # Frames are stored decoded, so there is nothing to gain from a partial parse
+        return self.next_session() if endpoint == "session" else None
+    
+    def post_json(self, endpoint, payload):
+        frame_time = self.current[0] if self.current else None
+        self.commands.append((frame_time, endpoint, payload))
+        log.info("Replay %s %s", endpoint, payload)
+        return True
+    
+    async def get_json_async(self, endpoint, parse=None):
+        return self.get_json(endpoint)
+    
+    async def post_json_async(self, endpoint, payload):
+        return self.post_json(endpoint, payload)
+    
+    def close(self):
+        pass
+
+def parse_targets(text):
+    """Split a comma-separated target list, e.g. alice, bob, team:orange"""
+    return [target.strip() for target in text.split(",") if target.strip()]
+
+class AutoDirector:
+    """Picks which of several ranked targets the camera should show
+    
+    Targets are player names or "team:<color>". Each tick the rules are tried in
+    order against the parsed session; the first one that names a present target
+    wins, otherwise the highest-ranked present target is shown. A new pick only
+    replaces the current one after min_dwell seconds.
+    """
+    RULES = ("scorer", "possession", "nearest_disc")
+    
+    def __init__(self, targets, rules=(), min_dwell=3.0, hysteresis=2.0, poll_interval=0.1, clock=time.monotonic):
+        unknown = [rule for rule in rules if rule not in self.RULES]
+        if unknown:
+            raise ValueError(f"Unknown director rules: {', '.join(unknown)}")
+        self.targets = targets
+        self.rules = list(rules)
+        self.min_dwell = min_dwell
+        self.hysteresis = hysteresis
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.current = None
+        self.switched_at = 0.0
+    
+    def candidates(self, session_data):
+        """Get the raw player dicts of present targets, best-ranked first"""
+        teams = session_data.get("teams", [])
+        ranked = []
+        for target in self.targets:
+            if target.lower().startswith("team:"):
+                color = target[5:].strip().upper()
+                for team in teams:
+                    if color and color in team.get("team", "").upper():
+                        ranked.extend(team.get("players", []))
+                continue
+            for team in teams:
+                if is_spectator_team(team.get("team", "")):
+                    continue
+                for player in team.get("players", []):
+                    if normalize_name(player.get("name", "")) == normalize_name(target):
+                        ranked.append(player)
+        
+        seen = set()
+        unique = []
+        for player in ranked:
+            name = player.get("name", "").lower()
+            if name not in seen:
+                seen.add(name)
+                unique.append(player)
+        return unique
+    
+    @staticmethod
+    def position_of(player):
+        return player.get("head", {}).get("position") or player.get("position")
+    
+    def rule_scorer(self, session_data, candidates):
+        """Show whoever just scored while the game is in its post-goal state"""
+        if session_data.get("game_status") != "score":
+            return None
+        scorer = session_data.get("last_score", {}).get("person_scored", "").lower()
+        return next((player for player in candidates if player.get("name", "").lower() == scorer), None)
+    
+    def rule_possession(self, session_data, candidates):
+        """Show the target holding the disc"""
+        return next((player for player in candidates if player.get("possession")), None)
+    
+    def rule_nearest_disc(self, session_data, candidates):
+        """Show the target closest to the disc, sticking with the current one unless clearly beaten"""
+        disc_position = session_data.get("disc", {}).get("position")
+        if not disc_position:
+            return None
+        
+        def distance(player):
+            position = self.position_of(player)
+            if not position:
+                return float("inf")
+            return sum((a - b) ** 2 for a, b in zip(position, disc_position)) ** 0.5
+        
+        nearest = min(candidates, key=distance)
+        current = next((player for player in candidates
+                        if self.current and player.get("name", "").lower() == self.current.lower()), None)
+        if current is not None and distance(current) - distance(nearest) < self.hysteresis:
+            return current
+        return nearest
+    
+    def choose(self, session_data):
+        """Get the name of the target to show, or None if no target is in the match"""
+        candidates = self.candidates(session_data or {})
+        if not candidates:
+            self.current = None
+            return None
+        
+        pick = None
+        for rule in self.rules:
+            pick = getattr(self, f"rule_{rule}")(session_data, candidates)
+            if pick is not None:
+                break
+        name = (pick or candidates[0]).get("name", "")
+        
+        now = self.clock()
+        current_present = any(player.get("name", "").lower() == (self.current or "").lower()
+                              for player in candidates)
+        if current_present and name.lower() != self.current.lower() and now - self.switched_at < self.min_dwell:
+            return self.current
+        if name != self.current:
+            self.current = name
+            self.switched_at = now
+        return self.current
+
+# Whether each UI endpoint's checkbox is the opposite of the flag the game takes
+# ("Hide UI" checked means {"visible": false}; "Mute Enemy Team" checked means true)
+UI_SETTINGS = {
+    "ui_visibility": True,
+    "nameplates_visibility": True,
+    "minimap_visibility": True,
+    "enemy_team_muted": False,
+}
+
+class UISettings:
+    """Desired UI/nameplate/minimap/mute state, kept in sync with the game
+    
+    Toggles only record the wanted value; one flush shortly after sends whatever still
+    differs from what the game last accepted, every endpoint at once. A new session or
+    the API coming back after a failure forgets what was applied, so it is all sent again.
+    Must be used on the engine's event loop.
+    """
+    def __init__(self, client, config, coalesce_delay=0.05):
+        self.client = client
+        self.config = config
+        self.coalesce_delay = coalesce_delay
+        self.desired = {endpoint: config[endpoint] for endpoint in UI_SETTINGS if endpoint in config}
+        self.applied = {}
+        self.flush_task = None
+        self.session_id = None
+        self.connected = False
+        self.on_applied = lambda: None
+    
+    def set(self, endpoint, checked):
+        """Record a checkbox change and schedule a flush"""
+        self.desired[endpoint] = checked
+        self.config[endpoint] = checked
+        self.schedule()
+    
+    def pending(self):
+        return {endpoint: checked for endpoint, checked in self.desired.items()
+                if self.applied.get(endpoint) != checked}
+    
+    def schedule(self):
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.flush())
+    
+    def reapply(self):
+        """Forget what the game has and send the whole desired state again"""
+        self.applied.clear()
+        self.schedule()
+    
+    def observe(self, session_data):
+        """Reapply after the API recovers or the sessionid changes; retry anything unsent"""
+        if session_data is None:
+            self.connected = False
+            return
+        session_id = session_data.get("sessionid")
+        if not self.connected or session_id != self.session_id:
+            self.connected = True
+            self.session_id = session_id
+            self.reapply()
+        elif self.pending():
+            self.schedule()
+    
+    async def send(self, endpoint, checked):
+        payload = {"visible": checked != UI_SETTINGS[endpoint]}
+        if await self.client.post_json_async(endpoint, payload):
+            self.applied[endpoint] = checked
+            return True
+        return False
+    
+    async def flush(self):
+        """Send every setting that differs from what the game last accepted"""
+        await asyncio.sleep(self.coalesce_delay)
+        changes = self.pending()
+        if not changes:
+            return True
+        results = await asyncio.gather(*(self.send(endpoint, checked) for endpoint, checked in changes.items()))
+        if any(results):
+            self.on_applied()
+        if all(results) and self.pending():
+            # Toggled again while the requests were in flight
+            self.flush_task = asyncio.ensure_future(self.flush())
+        return all(results)
+
+class FollowEngine:
+    """Camera-following logic shared by the Tk window and headless mode
+    
+    All coroutines and the start/stop methods must run on the engine's event loop.
+    Progress is reported through the on_* callbacks, which are called on that loop.
+    """
+    def __init__(self, config, base_url="http://127.0.0.1:6721", client=None, record_file=None, metrics=None):
+        self.config = config
+        self.corrections = self.config.setdefault("corrections", {})
         
         self.target_player = ""
         self.is_monitoring = False
-        self.base_url = "http://127.0.0.1:6721"
         self.verified_camera_index = None
-        self.config_file = "config.json"
+        self.active_camera_index = None
+        self.last_switch = 0.0
+        self.follow_task = None
+        self.targets = []
+        self.director = None
+        self.director_settings = dict(self.config.get("director", {}))
+        
+        self.metrics = metrics or Metrics()
+        self.profiler = None
+        self.profile_file = self.config.get("profile_file")
+        api_settings = self.config.get("api", {})
+        self.client = client or EchoVRClient(base_url,
+                                             pool_size=api_settings.get("pool_size", 4),
+                                             retries=api_settings.get("retries", 1),
+                                             timeouts=api_settings.get("timeouts"),
+                                             metrics=self.metrics)
+        record_file = record_file or self.config.get("record_file")
+        self.recorder = SessionRecorder(record_file) if record_file else None
+        self.snapshot = SessionSnapshot(self.get_session_data, metrics=self.metrics)
+        self.verifier = SlotVerifier()
+        self.settle_time = self.config.get("settle_time", 0.3)
+        # Times switches and director picks; replays swap in the recording's clock
+        self.clock = time.monotonic
+        polling = self.config.get("polling", {})
+        self.scheduler = PollScheduler(burst_interval=polling.get("burst_interval", 0.15),
+                                       idle_interval=polling.get("idle_interval", 1.0),
+                                       burst_duration=polling.get("burst_duration", 3.0),
+                                       backoff_initial=polling.get("backoff_initial", 1.0),
+                                       backoff_max=polling.get("backoff_max", 30.0))
+        self.watch_interval = polling.get("watch_interval", 5.0)
+        self.reassert_interval = self.config.get("reassert_interval", 2.0)
+        self.ui = UISettings(self.client, self.config)
+        self.ui.on_applied = lambda: self.on_config_changed()
+        
+        self.on_status = lambda message, is_error=False: None
+        self.on_camera = lambda camera_index: None
+        self.on_poll = lambda mode, delay: None
+        self.on_follow_state = lambda following: None
+        self.on_config_changed = lambda: None
+    
+    async def get_session_data(self):
+        """Get session data from Echo VR"""
+        # Following only needs names and head positions; the director and recordings need the whole frame
+        full = self.director or self.recorder or not self.config.get("api", {}).get("scan_session", True)
+        session_data = await self.client.get_json_async("session", parse=None if full else scan_session)
+        if self.recorder:
+            self.recorder.record(session_data)
+        return session_data
+    
+    async def switch_camera_to_index(self, camera_index):
+        """Switch camera to specific index"""
+        camera_mode = "pov" 
+        
+        self.last_switch = self.clock()
+        if await self.client.post_json_async("camera_mode", {"mode": camera_mode, "num": camera_index}):
+            self.metrics.inc("follower_camera_switches_total", result="ok")
+            self.active_camera_index = camera_index
+            return True
+        self.metrics.inc("follower_camera_switches_total", result="failed")
+        self.active_camera_index = None
+        return False
+    
+    def target_camera(self, player_name, api_camera):
+        """Get the camera to show a player: verified slot first, then the corrected static slot"""
+        key = self.snapshot.index.key_for(player_name)
+        return self.verifier.camera_for(self.snapshot, key, self.apply_correction(player_name, api_camera))
+    
+    def apply_correction(self, player_name, api_camera):
+        """Apply saved correction for player"""
+        if player_name in self.corrections:
+            correction = self.corrections[player_name]
+            corrected_camera = api_camera + correction
+            return corrected_camera
+        return api_camera
+    
+    async def refresh_roster(self):
+        """Fetch a fresh session to look targets up in; False, with backoff, if the API is unreachable"""
+        if await self.snapshot.refresh(force=True) is None:
+            self.scheduler.record_failure()
+            self.on_status("Echo VR API unreachable", True)
+            self.on_camera(None)
+            return False
+        self.scheduler.record_success()
+        return True
+    
+    async def switch_to_player(self, player_name):
+        """Find a player's camera and switch to it"""
+        if not await self.refresh_roster():
+            return False
+        # Typos and missing clan tags resolve to the in-game spelling
+        matched_name = self.snapshot.index.resolve(player_name)
+        if matched_name and matched_name != player_name:
+            self.on_status(f"Matched '{player_name}' to {matched_name}")
+            player_name = matched_name
+        self.target_player = player_name
+        
+        # Find initial camera
+        entry = await self.snapshot.lookup(player_name)
+        api_camera = entry[2] if entry else None
+        if not api_camera:
+            where = "is spectating" if entry else "not found in match"
+            self.on_status(f"Player '{player_name}' {where}", True)
+            self.on_camera(None)
+            return False
+        
+        final_camera = self.target_camera(player_name, api_camera)
+        self.verified_camera_index = final_camera
+        self.on_camera(final_camera)
+        
+        if await self.switch_camera_to_index(final_camera):
+            if final_camera != api_camera:
+                self.on_status(f"Switched to {player_name} on camera {final_camera} (corrected from {api_camera})")
+            else:
+                self.on_status(f"Switched to {player_name} on camera {final_camera}")
+            return True
+        
+        self.on_status(f"Failed to switch to camera {final_camera}", True)
+        return False
+    
+    async def follow_player(self, player_name):
+        """Switch to a player and keep following them"""
+        if await self.switch_to_player(player_name):
+            self.start_following()
+            return True
+        return False
+    
+    async def suggest_players(self, text):
+        """Get autocomplete names for the last entry of a comma-separated target list"""
+        await self.snapshot.refresh()
+        return self.snapshot.index.suggestions(text.split(",")[-1].strip())
+    
+    async def follow_targets(self, targets):
+        """Follow one player, or let the director pick among ranked players and teams"""
+        self.targets = list(targets)
+        if len(targets) == 1 and not targets[0].lower().startswith("team:"):
+            self.director = None
+            return await self.follow_player(targets[0])
+        
+        try:
+            self.director = AutoDirector(targets,
+                                         rules=self.director_settings.get("rules", []),
+                                         min_dwell=self.director_settings.get("min_dwell", 3.0),
+                                         hysteresis=self.director_settings.get("hysteresis", 2.0),
+                                         poll_interval=self.director_settings.get("poll_interval", 0.1),
+                                         clock=self.clock)
+        except ValueError as e:
+            self.on_status(str(e), True)
+            return False
+        if not await self.refresh_roster():
+            return False
+        chosen = self.director.choose(self.snapshot.data)
+        if not chosen:
+            self.on_status(f"None of {', '.join(targets)} found in match", True)
+            self.on_camera(None)
+            return False
+        return await self.follow_player(chosen)
+    
+    async def adjust_camera(self, adjustment):
+        """Move the camera by one slot, pin it for this roster and remember the offset"""
+        if not self.target_player or not self.verified_camera_index:
+            self.on_status("Set a player first", True)
+            return
+        
+        new_camera = self.verified_camera_index + adjustment
+        self.scheduler.burst()
+        
+        # One fresh snapshot serves both the range check and the correction
+        entry = await self.snapshot.lookup(self.target_player, force=True)
+        team = entry[0] if entry else ""
+        valid_range = team_cameras(team)
+            
+        if new_camera not in valid_range:
+            self.on_status(f"Camera {new_camera} out of valid range", True)
+            return
+        
+        if await self.switch_camera_to_index(new_camera):
+            self.verified_camera_index = new_camera
+            self.on_camera(new_camera)
+            key = self.snapshot.index.key_for(self.target_player)
+            if key:
+                self.verifier.sync(self.snapshot.index)
+                self.verifier.pin(key, new_camera)
+            
+            api_camera = entry[2] if entry else None
+            if api_camera:
+                correction = new_camera - api_camera
+                self.corrections[self.target_player] = correction
+                self.config["corrections"] = self.corrections
+                self.on_config_changed()
+            
+            self.on_status(f"Camera adjusted to {new_camera} (saved)")
+        else:
+            self.on_status("Failed to switch camera", True)
+    
+    def start_following(self):
+        """Start the follow loop for the current target"""
+        if not self.target_player or not self.verified_camera_index:
+            return
+        
+        if self.follow_task:
+            self.follow_task.cancel()
+        self.is_monitoring = True
+        self.follow_task = asyncio.ensure_future(self.follow_loop())
+        self.on_follow_state(True)
+        self.on_status(f"Following {self.target_player} on camera {self.verified_camera_index}")
+    
+    def stop_following(self, message="Stopped following", is_error=False):
+        """Cancel the follow loop and any request it has in flight"""
+        self.is_monitoring = False
+        if self.follow_task:
+            self.follow_task.cancel()
+            self.follow_task = None
+        self.active_camera_index = None
+        self.on_follow_state(False)
+        self.on_status(message, is_error)
+    
+    async def follow_loop(self):
+        """Poll the session and keep the camera on the target until cancelled"""
+        self.previous_roster = dict(self.snapshot.players)
+        shown_mode = None
+        self.scheduler.burst()
+        
+        while self.is_monitoring:
+            self.metrics.inc("follower_polls_total")
+            try:
+                session_data = await self.snapshot.refresh(force=True)
+                self.ui.observe(session_data)
+                if session_data is None:
+                    self.scheduler.record_failure()
+                else:
+                    self.scheduler.record_success()
+                    tick_started = time.perf_counter()
+                    keep_following = await self.follow_tick()
+                    self.metrics.observe("follower_tick_seconds", time.perf_counter() - tick_started)
+                    if not keep_following:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.inc("follower_loop_errors_total", type=type(e).__name__)
+                log.exception("Follow loop error")
+                self.scheduler.record_failure()
+            
+            delay = self.scheduler.next_delay()
+            mode = self.scheduler.mode()
+            if self.director and mode != "backoff":
+                delay = min(delay, self.director.poll_interval)
+            self.metrics.set("follower_poll_delay_seconds", delay)
+            if mode != shown_mode or mode == "backoff":
+                shown_mode = mode
+                self.on_poll(mode, delay)
+            await asyncio.sleep(delay)
+    
+    async def follow_tick(self):
+        """Act on one fresh snapshot; return False once following should end"""
+        roster = self.snapshot.players
+        joined, left, moved = SessionSnapshot.diff_rosters(self.previous_roster, roster)
+        self.previous_roster = dict(roster)
+        if joined or left or moved:
+            self.scheduler.burst()
+        
+        if self.director:
+            chosen = self.director.choose(self.snapshot.data)
+            if chosen is None:
+                if self.target_player:
+                    self.target_player = ""
+                    self.on_status("Waiting for a target to join the match", True)
+                return True
+            if chosen.lower() != self.target_player.lower():
+                self.target_player = chosen
+                self.on_status(f"Director picked {chosen}")
+        
+        entry = self.snapshot.entry(self.target_player)
+        if not entry or entry[2] is None:
+            # Keep polling so the camera comes back as soon as they rejoin a team
+            if self.verified_camera_index is not None:
+                self.verified_camera_index = None
+                self.active_camera_index = None
+                self.on_camera(None)
+                where = "moved to the spectators" if entry else "left the match"
+                self.on_status(f"{self.target_player} {where}, waiting for them to join a team", True)
+            return True
+        
+        key = self.snapshot.index.key_for(self.target_player)
+        if self.verifier.sync(self.snapshot.index) and self.active_camera_index is not None:
+            # Pre-switch to the predicted slot now; roll back here if it turns out wrong
+            self.verifier.predict(key, self.active_camera_index)
+        drifted = False
+        since_switch = self.clock() - self.last_switch
+        if self.active_camera_index is not None and since_switch >= self.settle_time:
+            shown = self.snapshot.pov_player()
+            if self.verifier.is_pinned(key):
+                # A slot picked by hand is not checked against the target, only for the game moving off it
+                drifted = shown is not None and self.verifier.pinned_moved(key, shown) \
+                    and since_switch >= self.reassert_interval
+            elif shown is not None and since_switch < self.reassert_interval:
+                # Shortly after our own switch, whoever the camera shows is on that slot
+                was_verified = self.verifier.is_verified(key)
+                self.verifier.learn(shown, self.active_camera_index)
+                if shown == key and not was_verified:
+                    self.on_status(f"Verified {self.target_player} on camera {self.active_camera_index}")
+                elif shown != key:
+                    self.on_status(f"Camera {self.active_camera_index} shows {self.snapshot.index.names.get(shown, shown)}, "
+                                   f"looking for {self.target_player}")
+            elif shown is None and since_switch < self.reassert_interval and self.verifier.is_predicted(key) \
+                    and self.snapshot.pov_position():
+                # The predicted slot is empty
+                self.verifier.rule_out(key, self.active_camera_index)
+                self.on_status(f"Camera {self.active_camera_index} shows nobody, looking for {self.target_player}")
+            elif shown is not None and shown != key:
+                # Long after a switch the slot is trusted, so the game moved the camera itself
+                drifted = True
+        
+        final_camera = self.target_camera(self.target_player, entry[2])
+        if final_camera != self.verified_camera_index:
+            self.verified_camera_index = final_camera
+            self.on_camera(final_camera)
+        
+        # Only talk to /camera_mode when our slot moved or the game drifted off it
+        needs_switch = final_camera != self.active_camera_index or drifted
+        
+        if needs_switch:
+            self.scheduler.burst()
+            if not await self.switch_camera_to_index(final_camera):
+                return True
+            if joined or left or moved:
+                self.on_status(f"Roster changed, following {self.target_player} on camera {final_camera}")
+            elif final_camera == self.verifier.fallbacks.get(key):
+                self.on_status(f"Prediction was wrong, back to {self.target_player} on camera {final_camera}")
+        return True
+    
+    async def watch_idle(self):
+        """Poll lightly while not following, so UI settings are reapplied after a game restart or new match"""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            if self.is_monitoring:
+                continue
+            try:
+                # Waiting for a player already polls; only fetch when nothing else has lately
+                fetched_at = self.snapshot.fetched_at
+                if fetched_at is not None and time.monotonic() - fetched_at < self.watch_interval:
+                    self.ui.observe(self.snapshot.data)
+                else:
+                    self.ui.observe(await self.snapshot.refresh(force=True))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Idle watch error")
+    
+    async def profile_loop(self, interval=30.0):
+        """Profile the engine thread, dumping pstats to profile_file every interval seconds
+        
+        Only the event loop thread is profiled; time spent waiting on the game API shows
+        up in the latency histograms instead. Inspect with `python -m pstats <file>`.
+        """
+        path = self.profile_file
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        try:
+            while self.profiler:
+                await asyncio.sleep(interval)
+                if self.profiler:
+                    # dump_stats disables the profiler, so turn it back on afterwards
+                    self.profiler.dump_stats(path)
+                    self.profiler.enable()
+        finally:
+            self.dump_profile()
+    
+    def dump_profile(self):
+        """Write the final profile and stop profiling"""
+        if self.profiler:
+            self.profiler.dump_stats(self.profile_file)
+            self.profiler = None
+            log.info("Profile written to %s", self.profile_file)
+    
+    def close(self):
+        """Stop following and release pooled connections"""
+        self.dump_profile()
+        if self.is_monitoring:
+            self.stop_following()
+        if self.recorder:
+            self.recorder.close()
+        self.client.close()
+
+# Per-client keys that must not be inherited from the top of the config
+RIG_LOCAL_KEYS = ("instances", "record_file", "last_username")
+# Settings the engines change in place; each client starts from its own copy of the top-level value
+RIG_COPIED_KEYS = ("corrections",)
+
+class Rig:
+    """One FollowEngine per game client listed under "instances" in the config
+    
+    All engines run on the same event loop and share one requests session (so one
+    connection pool), the metrics and the thread pool behind the blocking requests.
+    Each keeps its own target, follow state, poll scheduler and UI settings. An
+    instance entry looks like {"name": "cam1", "url": "http://10.0.0.5:6721",
+    "player": "alice, team:blue"}; any other key overrides the top-level setting
+    for that client, and settings the engine changes are saved into the entry. Saved
+    camera corrections start as a copy of the top-level ones and are then per client.
+    """
+    def __init__(self, config, profile_file=None):
+        self.config = config
+        self.metrics = Metrics()
+        instances = config.setdefault("instances", [])
+        api_settings = config.get("api", {})
+        self.http = EchoVRClient.make_session(pool_size=api_settings.get("pool_size", 4),
+                                              retries=api_settings.get("retries", 1),
+                                              hosts=max(1, len(instances)))
+        shared = {key: value for key, value in config.items() if key not in RIG_LOCAL_KEYS}
+        self.members = []
+        for number, instance in enumerate(instances, 1):
+            instance.setdefault("name", f"client{number}")
+            for key in RIG_COPIED_KEYS:
+                if key in shared and key not in instance:
+                    instance[key] = copy.deepcopy(shared[key])
+            url = instance.get("url", "http://127.0.0.1:6721")
+            client = EchoVRClient(url, timeouts=api_settings.get("timeouts"), metrics=self.metrics, http=self.http)
+            engine = FollowEngine(collections.ChainMap(instance, shared), url, client=client, metrics=self.metrics)
+            # The engines share one thread, so the first engine's profiler covers them all
+            engine.profile_file = None if self.members else profile_file or engine.profile_file
+            self.members.append((instance, engine))
+    
+    def close(self):
+        """Close every engine, then the shared connection pool"""
+        for _, engine in self.members:
+            engine.close()
+        self.http.close()
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+
+class ControlServer:
+    """Local HTTP/WebSocket API so Stream Deck, OBS scripts or hotkeys can drive the engines
+    
+    Runs on the engines' event loop, so commands call straight into FollowEngine with no
+    thread hop, and state is answered from what the engines already know; it never
+    fetches /session itself. Commands are JSON objects such as {"action": "adjust", "by": 1},
+    {"action": "target", "player": "alice"}, {"action": "stop"}, {"action": "start"} or
+    {"action": "ui", "endpoint": "minimap_visibility", "checked": true}, with an optional
+    "instance" naming a Rig client (the first one otherwise). They can be sent as a
+    WebSocket text message, POSTed to /command, or as POST /<action>?by=1&instance=cam1.
+    GET /state returns every instance's state; WebSocket clients are pushed the state of
+    an instance whenever its target, camera, follow state or status changes. Global
+    hotkeys map key combinations to the same commands. Create it after the engines'
+    callbacks are set, since it chains onto them.
+    
+    So that web pages the streamer opens cannot drive the camera, requests and upgrades
+    whose Origin is not a local page (or listed in origins) are refused, and POSTs must
+    be sent as application/json, which browsers cannot do cross-origin without asking.
+    """
+    LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+    
+    def __init__(self, engines, port=None, hotkeys=None, host="127.0.0.1", origins=()):
+        self.engines = dict(engines)
+        self.host = host
+        self.port = port
+        self.hotkeys = hotkeys or {}
+        self.origins = set(origins)
+        self.server = None
+        self.sockets = set()
+        self.connections = set()
+        self.statuses = {name: ("", False) for name in self.engines}
+        for name, engine in self.engines.items():
+            self.watch(name, engine)
+    
+    def watch(self, name, engine):
+        """Chain onto the engine's callbacks so every change is pushed to WebSocket clients"""
+        on_status, on_camera, on_follow_state = engine.on_status, engine.on_camera, engine.on_follow_state
+        
+        def status_changed(message, is_error=False):
+            self.statuses[name] = (message, is_error)
+            on_status(message, is_error)
+            self.broadcast(name)
+        
+        def camera_changed(camera_index):
+            on_camera(camera_index)
+            self.broadcast(name)
+        
+        def follow_state_changed(following):
+            on_follow_state(following)
+            self.broadcast(name)
+        
+        engine.on_status, engine.on_camera, engine.on_follow_state = status_changed, camera_changed, follow_state_changed
+    
+    def state(self, name):
+        engine = self.engines[name]
+        status, is_error = self.statuses[name]
+        return {
+            "instance": name,
+            "target": engine.target_player,
+            "camera": engine.verified_camera_index,
+            "following": engine.is_monitoring,
+            "status": status,
+            "is_error": is_error,
+            "players": sorted(engine.snapshot.index.names.values()),
+        }
+    
+    @classmethod
+    def from_config(cls, engines, config, port=None):
+        """Build from "control_port"/"hotkeys"/"control_origins" settings, or None when neither port nor hotkeys is set"""
+        port = port or config.get("control_port")
+        hotkeys = config.get("hotkeys")
+        if not port and not hotkeys:
+            return None
+        return cls(engines, port, hotkeys, origins=config.get("control_origins", ()))
+    
+    async def start(self):
+        """Listen on the control port and bind hotkeys; must run on the engines' loop"""
+        if self.port:
+            self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            log.info("Control API on http://%s:%d (WebSocket on the same port)", self.host, self.port)
+        if self.hotkeys:
+            self.bind_hotkeys(asyncio.get_running_loop())
+    
+    def close(self):
+        if self.server:
+            self.server.close()
+        # Keep-alive HTTP and WebSocket clients alike, so none is left for asyncio.run to cancel
+        for task in list(self.connections):
+            task.cancel()
+    
+    async def run_command(self, command):
+        """Apply one command; returns (ok, message)"""
+        name = command.get("instance") or next(iter(self.engines))
+        if not isinstance(name, str) or name not in self.engines:
+            return False, f"Unknown instance {name}"
+        engine = self.engines[name]
+        action = command.get("action")
+        if action == "adjust":
+            by = command.get("by", 1)
+            if isinstance(by, str) and by.lstrip("+-").isdigit():
+                by = int(by)
+            if not isinstance(by, int):
+                return False, "by must be a whole number of slots"
+            await engine.adjust_camera(by)
+        elif action == "target":
+            targets = parse_targets(str(command.get("player", "")))
+            if not targets:
+                return False, "No player given"
+            if not await engine.follow_targets(targets):
+                return False, self.statuses[name][0]
+        elif action == "stop":
+            # Also keeps headless mode from picking the targets straight back up
+            engine.targets = []
+            engine.stop_following()
+        elif action == "start":
+            if not engine.targets and engine.target_player:
+                engine.targets = [engine.target_player]
+            engine.start_following()
+            if not engine.is_monitoring:
+                return False, "Set a player first"
+        elif action == "ui":
+            endpoint = command.get("endpoint")
+            if not isinstance(endpoint, str) or endpoint not in UI_SETTINGS:
+                return False, f"Unknown UI setting {endpoint}"
+            checked = bool(command.get("checked"))
+            engine.ui.set(endpoint, checked)
+            return True, f"{endpoint} {'checked' if checked else 'unchecked'}"
+        else:
+            return False, f"Unknown action {action}"
+        return True, self.statuses[name][0]
+    
+    def allows_origin(self, headers):
+        """Accept clients that send no Origin (scripts, Stream Deck) and pages served locally"""
+        origin = headers.get("origin")
+        if origin is None or origin in self.origins:
+            return True
+        return urlsplit(origin).hostname in self.LOCAL_HOSTS
+    
+    @staticmethod
+    async def reply(writer, status, reply):
+        payload = json.dumps(reply).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+        await writer.drain()
+    
+    async def handle_connection(self, reader, writer):
+        """Serve keep-alive HTTP requests until the client upgrades to a WebSocket or leaves"""
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                
+                if not self.allows_origin(headers):
+                    await self.reply(writer, "403 Forbidden", {"ok": False, "message": "Origin not allowed"})
+                    return
+                if headers.get("upgrade", "").lower() == "websocket":
+                    if "sec-websocket-key" not in headers:
+                        await self.reply(writer, "400 Bad Request", {"ok": False, "message": "Missing Sec-WebSocket-Key"})
+                        return
+                    await self.serve_websocket(reader, writer, headers)
+                    return
+                
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if method == "POST" and content_type != "application/json":
+                    status, reply = "415 Unsupported Media Type", {"ok": False, "message": "POSTs must be application/json"}
+                else:
+                    status, reply = await self.handle_http(method, target, body)
+                await self.reply(writer, status, reply)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.CancelledError):
+            # Cancelled by close(); the connection task simply ends
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+    
+    async def handle_http(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.strip("/")
+        if method == "GET" and path == "state":
+            return "200 OK", [self.state(name) for name in self.engines]
+        if method != "POST":
+            return "404 Not Found", {"ok": False, "message": "Not found"}
+        
+        try:
+            command = json.loads(body) if body else {}
+        except ValueError:
+            return "400 Bad Request", {"ok": False, "message": "Body is not JSON"}
+        if not isinstance(command, dict):
+            return "400 Bad Request", {"ok": False, "message": "Body is not a JSON object"}
+        if path != "command":
+            command.setdefault("action", path)
+        for key, values in parse_qs(url.query).items():
+            command.setdefault(key, values[-1])
+        try:
+            ok, message = await self.run_command(command)
+        except (ValueError, TypeError) as e:
+            ok, message = False, f"Bad command: {e}"
+        return ("200 OK" if ok else "400 Bad Request"), {"ok": ok, "message": message}
+    
+    async def serve_websocket(self, reader, writer, headers):
+        """Finish the RFC 6455 handshake, then read commands and push state"""
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WEBSOCKET_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        self.sockets.add(writer)
+        try:
+            for name in self.engines:
+                self.send_frame(writer, json.dumps(self.state(name)).encode())
+            while True:
+                opcode, payload = await self.read_frame(reader)
+                if opcode == 0x8:
+                    self.send_frame(writer, payload[:2], opcode=0x8)
+                    return
+                if opcode == 0x9:
+                    self.send_frame(writer, payload, opcode=0xA)
+                elif opcode == 0x1:
+                    try:
+                        command = json.loads(payload)
+                    except ValueError:
+                        command = None
+                    if isinstance(command, dict):
+                        try:
+                            ok, message = await self.run_command(command)
+                        except (ValueError, TypeError) as e:
+                            ok, message = False, f"Bad command: {e}"
+                    else:
+                        ok, message = False, "Message is not a JSON command"
+                    self.send_frame(writer, json.dumps({"ok": ok, "message": message}).encode())
+        finally:
+            self.sockets.discard(writer)
+    
+    @staticmethod
+    async def read_frame(reader):
+        """Read one client frame (always masked) and return (opcode, payload)"""
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack("!Q", await reader.readexactly(8))
+        mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+        payload = await reader.readexactly(length)
+        return first & 0x0F, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    
+    @staticmethod
+    def send_frame(writer, payload, opcode=0x1):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        writer.write(header + payload)
+    
+    def broadcast(self, name):
+        if not self.sockets:
+            return
+        payload = json.dumps(self.state(name)).encode()
+        for writer in list(self.sockets):
+            if writer.is_closing():
+                self.sockets.discard(writer)
+            else:
+                self.send_frame(writer, payload)
+    
+    def bind_hotkeys(self, loop):
+        """Map global hotkeys (e.g. "ctrl+alt+right") to commands; needs the optional keyboard package"""
+        try:
+            import keyboard
+        except ImportError:
+            log.warning("Hotkeys need the keyboard package (pip install keyboard)")
+            return
+        for combo, command in self.hotkeys.items():
+            # keyboard calls back on its own thread
+            keyboard.add_hotkey(combo, lambda command=command: loop.call_soon_threadsafe(
+                asyncio.ensure_future, self.run_command(command)))
+
+class EngineWindow:
+    """Tk plumbing shared by the windows: colors and the engine thread hand-off"""
+    bg_color = "#2b2b2b"
+    card_color = "#3c3f41"
+    accent_color = "#4a9cff"
+    text_color = "#ffffff"
+    subtle_text = "#aaaaaa"
+    
+    def post_ui(self, callback, *args):
+        """Queue a callback to run on the Tk thread"""
+        self.ui_queue.put((callback, args))
+    
+    def process_ui_queue(self):
+        """Run callbacks queued by the engine thread"""
+        while True:
+            try:
+                callback, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            callback(*args)
+        self.root.after(50, self.process_ui_queue)
+    
+    def run_on_engine(self, callback, *args):
+        """Call a FollowEngine method on the engine thread"""
+        self.engine_thread.loop.call_soon_threadsafe(callback, *args)
+
+class EchoVRFollowMe(EngineWindow):
+    def __init__(self, root, control_port=None, metrics_port=None, profile_file=None,
+                 config_file="config.json", base_url="http://127.0.0.1:6721", rate=None, record_file=None):
+        import_tk()
+        self.root = root
+        self.root.title("Echo VR Camera Follower")
+        self.root.geometry("400x662")
+        self.root.resizable(False, False)
+        
+        self.root.configure(bg=self.bg_color)
+        
+        self.base_url = base_url
+        self.config_file = config_file
         
         # UI visibility states
         self.ui_visibility_var = tk.BooleanVar()
         self.nameplates_visibility_var = tk.BooleanVar()
         self.minimap_visibility_var = tk.BooleanVar()
         self.enemy_team_muted_var = tk.BooleanVar()
+        self.ui_vars = {
+            "ui_visibility": self.ui_visibility_var,
+            "nameplates_visibility": self.nameplates_visibility_var,
+            "minimap_visibility": self.minimap_visibility_var,
+            "enemy_team_muted": self.enemy_team_muted_var,
+        }
         
         # Load config
-        self.config = self.load_config()
-        self.corrections = self.config.get("corrections", {})
+        self.store = ConfigStore(self.config_file)
+        self.config = self.store.data
+        self.store.debounce = self.config.get("save_debounce", 1.0)
         self.last_username = self.config.get("last_username", "")
         
+        # Network work runs on the engine thread; results come back through ui_queue
+        self.engine_thread = EngineThread()
+        self.ui_queue = queue.Queue()
+        self.engine = FollowEngine(self.config, self.base_url, record_file=record_file)
+        if rate:
+            self.engine.scheduler.idle_interval = 1 / rate
+        self.engine.on_status = lambda message, is_error=False: self.post_ui(self.update_status, message, is_error)
+        self.engine.on_camera = lambda camera_index: self.post_ui(self.update_camera_display, camera_index)
+        self.engine.on_poll = lambda mode, delay: self.post_ui(self.update_poll_display, mode, delay)
+        self.engine.on_follow_state = lambda following: self.post_ui(self.update_follow_buttons, following)
+        self.engine.on_config_changed = self.config_changed
+        # Command-line instrumentation applies to this run only and is not saved
+        metrics_port = metrics_port or self.config.get("metrics_port")
+        if metrics_port:
+            serve_metrics(self.engine.metrics, metrics_port)
+        if profile_file:
+            self.engine.profile_file = profile_file
+        if self.engine.profile_file:
+            self.engine_thread.submit(self.engine.profile_loop())
+        self.engine_thread.submit(self.engine.watch_idle())
+        self.control = ControlServer.from_config([("default", self.engine)], self.config, control_port)
+        if self.control:
+            self.engine_thread.submit(self.control.start())
+        
         # Load UI settings from config
-        self.ui_visibility_var.set(self.config.get("ui_visibility", False))
-        self.nameplates_visibility_var.set(self.config.get("nameplates_visibility", False))
-        self.minimap_visibility_var.set(self.config.get("minimap_visibility", False))
-        self.enemy_team_muted_var.set(self.config.get("enemy_team_muted", False))
+        for endpoint, var in self.ui_vars.items():
+            var.set(self.config.get(endpoint, False))
         
         self.create_ui()
-        
-    def load_config(self):
-        """Load configuration from file"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {"corrections": {}, "last_username": ""}
-        return {"corrections": {}, "last_username": ""}
-    
-    def save_config(self):
-        """Save configuration to file"""
-        try:
-            # Update config with current UI settings
-            self.config.update({
-                "ui_visibility": self.ui_visibility_var.get(),
-                "nameplates_visibility": self.nameplates_visibility_var.get(),
-                "minimap_visibility": self.minimap_visibility_var.get(),
-                "enemy_team_muted": self.enemy_team_muted_var.get()
-            })
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            print(f"Failed to save config: {e}")
+        self.process_ui_queue()
+    
+    def config_changed(self):
+        """Save the config; runs on the engine thread, which owns it"""
+        self.store.save()
+        # UISettings owns the UI keys; show changes made elsewhere, e.g. through the control API
+        settings = {endpoint: self.config[endpoint] for endpoint in self.ui_vars if endpoint in self.config}
+        self.post_ui(self.show_ui_settings, settings)
+    
+    def show_ui_settings(self, settings):
+        for endpoint, checked in settings.items():
+            if self.ui_vars[endpoint].get() != checked:
+                self.ui_vars[endpoint].set(checked)
+    
+    def remember_username(self, player_name):
+        """Store the last target; runs on the engine thread"""
+        self.config["last_username"] = player_name
+        self.store.save()
     
     def create_ui(self):
         # Main container
@@ -96,7 +2070,7 @@ class EchoVRFollowMe:
                 fg=self.subtle_text, bg=self.card_color).pack(anchor=tk.W, padx=15, pady=(15, 5))
         
         input_frame = tk.Frame(player_card, bg=self.card_color)
-        input_frame.pack(fill=tk.X, padx=15, pady=(0, 15))
+        input_frame.pack(fill=tk.X, padx=15, pady=(0, 2))
         
         self.player_entry = tk.Entry(input_frame, font=("Arial", 12), bg="#505050", 
                                    fg=self.text_color, insertbackground=self.text_color,
@@ -104,12 +2078,19 @@ class EchoVRFollowMe:
         self.player_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=8)
         self.player_entry.insert(0, self.last_username)
         self.player_entry.bind('<Return>', lambda e: self.set_target_player())
+        self.player_entry.bind('<KeyRelease>', self.on_player_typed)
+        self.player_entry.bind('<Tab>', self.accept_suggestion)
         
         set_btn = tk.Button(input_frame, text="SET", font=("Arial", 10, "bold"), 
                            bg=self.accent_color, fg=self.text_color, relief=tk.FLAT, bd=0,
                            command=self.set_target_player, padx=20)
         set_btn.pack(side=tk.RIGHT, padx=(10, 0))
         
+        self.suggestions = []
+        self.suggestion_label = tk.Label(player_card, text="", font=("Arial", 8), fg=self.subtle_text,
+                                         bg=self.card_color, anchor=tk.W)
+        self.suggestion_label.pack(fill=tk.X, padx=15, pady=(0, 8))
+        
         camera_card = tk.Frame(main_frame, bg=self.card_color, relief=tk.FLAT, bd=0)
         camera_card.pack(fill=tk.X, pady=(0, 15))
         
@@ -207,7 +2188,17 @@ class EchoVRFollowMe:
         self.status_label = tk.Label(status_card, text="Enter player name to begin", 
                                     font=("Arial", 11), fg=self.text_color, bg=self.card_color, 
                                     wraplength=350, justify=tk.LEFT)
-        self.status_label.pack(fill=tk.X, padx=15, pady=(0, 15))
+        self.status_label.pack(fill=tk.X, padx=15, pady=(0, 5))
+        
+        self.poll_label = tk.Label(status_card, text=f"Polling idle ({self.engine.scheduler.describe()})",
+                                  font=("Arial", 8), fg=self.subtle_text, bg=self.card_color,
+                                  wraplength=350, justify=tk.LEFT)
+        self.poll_label.pack(fill=tk.X, padx=15, pady=(0, 2))
+        
+        self.stats_label = tk.Label(status_card, text="", font=("Arial", 8), fg=self.subtle_text,
+                                   bg=self.card_color, wraplength=350, justify=tk.LEFT)
+        self.stats_label.pack(fill=tk.X, padx=15, pady=(0, 15))
+        self.update_stats_display()
         
         footer_frame = tk.Frame(main_frame, bg=self.bg_color)
         footer_frame.pack(fill=tk.X, pady=(20, 0))
@@ -218,112 +2209,81 @@ class EchoVRFollowMe:
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
-    def send_ui_command(self, endpoint, value):
-        """Send UI visibility command to Echo VR"""
-        try:
-            payload = {"visible": value}
-            response = requests.post(f"{self.base_url}/{endpoint}", json=payload, timeout=2)
-            return response.status_code == 200
-        except:
-            return False
+    def set_ui_setting(self, endpoint):
+        """Hand a checkbox change to the engine's UISettings"""
+        self.run_on_engine(self.engine.ui.set, endpoint, self.ui_vars[endpoint].get())
     
     def toggle_ui_visibility(self):
         """Toggle UI visibility"""
-        value = not self.ui_visibility_var.get() 
-        if self.send_ui_command("ui_visibility", value):
-            self.save_config()
+        self.set_ui_setting("ui_visibility")
     
     def toggle_nameplates_visibility(self):
         """Toggle nameplates visibility"""
-        value = not self.nameplates_visibility_var.get()  
-        if self.send_ui_command("nameplates_visibility", value):
-            self.save_config()
+        self.set_ui_setting("nameplates_visibility")
     
     def toggle_minimap_visibility(self):
         """Toggle minimap visibility"""
-        value = not self.minimap_visibility_var.get() 
-        if self.send_ui_command("minimap_visibility", value):
-            self.save_config()
+        self.set_ui_setting("minimap_visibility")
     
     def toggle_enemy_team_muted(self):
         """Toggle enemy team muted"""
-        value = self.enemy_team_muted_var.get()
-        if self.send_ui_command("enemy_team_muted", value):
-            self.save_config()
+        self.set_ui_setting("enemy_team_muted")
     
     def update_status(self, message, is_error=False):
         """Update status message with color coding"""
         color = "#e74c3c" if is_error else self.text_color
         self.status_label.config(text=message, fg=color)
     
+    def update_poll_display(self, mode, delay):
+        """Show the current polling mode and rate"""
+        self.poll_label.config(text=f"Polling {mode} every {delay * 1000:.0f} ms ({self.engine.scheduler.describe()})")
+    
+    def update_stats_display(self):
+        """Refresh the poll rate / latency / error line once a second"""
+        self.stats_label.config(text=self.engine.metrics.summary())
+        self.root.after(1000, self.update_stats_display)
+    
     def update_camera_display(self, camera_index):
         """Update the camera number display"""
         if camera_index:
             self.camera_display.config(text=str(camera_index))
         else:
             self.camera_display.config(text="--")
+            self.start_btn.config(state=tk.DISABLED)
     
-    def get_session_data(self):
-        """Get session data from Echo VR"""
-        try:
-            response = requests.get(f"{self.base_url}/session", timeout=2)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except:
-            return None
+    def update_follow_buttons(self, following):
+        """Enable the controls that match the follow state"""
+        self.start_btn.config(state=tk.DISABLED if following else tk.NORMAL)
+        self.stop_btn.config(state=tk.NORMAL if following else tk.DISABLED)
+        self.player_entry.config(state=tk.DISABLED if following else tk.NORMAL)
     
-    def switch_camera_to_index(self, camera_index):
-        """Switch camera to specific index"""
-        camera_mode = "pov" 
-        
-        try:
-            payload = {"mode": camera_mode, "num": camera_index}
-            response = requests.post(f"{self.base_url}/camera_mode", json=payload, timeout=2)
-            return response.status_code == 200
-        except:
-            return False
+    def on_player_typed(self, event):
+        """Fetch autocomplete suggestions for what has been typed"""
+        if event.keysym in ("Return", "Tab"):
+            return
+        self.engine_thread.submit(self.load_suggestions(self.player_entry.get()))
     
-    def build_camera_mapping(self):
-        """Build camera to player mapping from session data"""
-        session_data = self.get_session_data()
-        if not session_data:
-            return {}
-            
-        camera_mapping = {}
-        teams = session_data.get("teams", [])
-        
-        for team in teams:
-            team_name = team.get("team", "Unknown")
-            players = team.get("players", [])
-            
-            for player_index, player in enumerate(players):
-                player_name = player.get("name", "Unknown")
-                if "ORANGE" in team_name.upper():
-                    camera_index = player_index + 1
-                else:
-                    camera_index = player_index + 6
-                
-                camera_mapping[camera_index] = player_name
-        
-        return camera_mapping
+    async def load_suggestions(self, text):
+        suggestions = await self.engine.suggest_players(text)
+        self.post_ui(self.show_suggestions, text, suggestions)
     
-    def get_api_suggested_camera(self, player_name):
-        """Get the camera index that API suggests for this player"""
-        camera_mapping = self.build_camera_mapping()
-        
-        for camera_index, mapped_player in camera_mapping.items():
-            if mapped_player.lower() == player_name.lower():
-                return camera_index
-        return None
+    def show_suggestions(self, text, suggestions):
+        """Show suggestions unless the entry changed while they were loading"""
+        if text != self.player_entry.get():
+            return
+        self.suggestions = suggestions
+        self.suggestion_label.config(text=f"Tab: {', '.join(suggestions)}" if suggestions else "")
     
-    def apply_correction(self, player_name, api_camera):
-        """Apply saved correction for player"""
-        if player_name in self.corrections:
-            correction = self.corrections[player_name]
-            corrected_camera = api_camera + correction
-            return corrected_camera
-        return api_camera
+    def accept_suggestion(self, event):
+        """Complete the last comma-separated entry with the first suggestion"""
+        if not self.suggestions:
+            return None
+        entries = self.player_entry.get().split(",")
+        entries[-1] = (" " if len(entries) > 1 else "") + self.suggestions[0]
+        self.player_entry.delete(0, tk.END)
+        self.player_entry.insert(0, ",".join(entries))
+        self.show_suggestions(self.player_entry.get(), [])
+        return "break"
     
     def set_target_player(self):
         player_name = self.player_entry.get().strip()
@@ -331,138 +2291,352 @@ class EchoVRFollowMe:
             self.update_status("Please enter a player name", is_error=True)
             return
         
-        self.target_player = player_name
-        
         # Save username to config
-        self.config["last_username"] = player_name
-        self.save_config()
-        
-        # Find initial camera
-        api_camera = self.get_api_suggested_camera(player_name)
-        if not api_camera:
-            self.update_status(f"Player '{player_name}' not found in match", is_error=True)
-            self.update_camera_display(None)
-            self.start_btn.config(state=tk.DISABLED)
-            return
+        self.run_on_engine(self.remember_username, player_name)
         
-        final_camera = self.apply_correction(player_name, api_camera)
-        self.verified_camera_index = final_camera
-        self.update_camera_display(final_camera)
-        
-        if self.switch_camera_to_index(final_camera):
-            if final_camera != api_camera:
-                self.update_status(f"Switched to {player_name} on camera {final_camera} (corrected from {api_camera})")
-            else:
-                self.update_status(f"Switched to {player_name} on camera {final_camera}")
-            
-            self.start_following()
-        else:
-            self.update_status(f"Failed to switch to camera {final_camera}", is_error=True)
+        self.update_status(f"Looking for {player_name}...")
+        self.engine_thread.submit(self.engine.follow_targets(parse_targets(player_name)))
     
     def adjust_camera(self, adjustment):
         """Manually adjust the current camera index"""
-        if not self.target_player or not self.verified_camera_index:
-            self.update_status("Set a player first", is_error=True)
-            return
+        self.engine_thread.submit(self.engine.adjust_camera(adjustment))
+    
+    def start_following(self):
+        self.run_on_engine(self.engine.start_following)
         
-        new_camera = self.verified_camera_index + adjustment
+    def stop_following(self):
+        self.run_on_engine(self.engine.stop_following)
+    
+    def on_closing(self):
+        """Save config and close"""
+        self.run_on_engine(self.engine.close)
+        self.store.flush()
+        self.engine_thread.stop()
+        self.root.destroy()
+
+class RigWindow(EngineWindow):
+    """Compact window with one row per game client of a Rig"""
+    def __init__(self, root, store, control_port=None, metrics_port=None, profile_file=None):
+        import_tk()
+        self.root = root
+        self.store = store
+        self.root.title("Echo VR Camera Follower - rig")
+        self.root.configure(bg=self.bg_color)
         
-        team = self.get_player_team(self.target_player)
-        if team and "ORANGE" in team.upper():
-            valid_range = range(1, 5)
-        else:
-            valid_range = range(6, 10)
-            
-        if new_camera not in valid_range:
-            self.update_status(f"Camera {new_camera} out of valid range", is_error=True)
-            return
+        self.engine_thread = EngineThread()
+        self.ui_queue = queue.Queue()
+        self.rig = Rig(store.data, profile_file)
+        self.rows = []
+        metrics_port = metrics_port or store.data.get("metrics_port")
+        if metrics_port:
+            serve_metrics(self.rig.metrics, metrics_port)
+        for _, engine in self.rig.members:
+            if engine.profile_file:
+                self.engine_thread.submit(engine.profile_loop())
+            self.engine_thread.submit(engine.watch_idle())
         
-        if self.switch_camera_to_index(new_camera):
-            old_camera = self.verified_camera_index
-            self.verified_camera_index = new_camera
-            self.update_camera_display(new_camera)
-            
-            api_camera = self.get_api_suggested_camera(self.target_player)
-            if api_camera:
-                correction = new_camera - api_camera
-                self.corrections[self.target_player] = correction
-                self.config["corrections"] = self.corrections
-                self.save_config()
-            
-            self.update_status(f"Camera adjusted to {new_camera} (saved)")
-        else:
-            self.update_status("Failed to switch camera", is_error=True)
-    
-    def get_player_team(self, player_name):
-        """Determine which team a player is on"""
-        session_data = self.get_session_data()
-        if not session_data:
-            return None
-            
-        teams = session_data.get("teams", [])
-        for team in teams:
-            team_name = team.get("team", "Unknown")
-            players = team.get("players", [])
-            for player in players:
-                if player.get("name", "").lower() == player_name.lower():
-                    return team_name
-        return None
-    
-    def start_following(self):
-        if not self.target_player or not self.verified_camera_index:
-            return
+        main_frame = tk.Frame(self.root, bg=self.bg_color, padx=15, pady=15)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        if not self.rig.members:
+            tk.Label(main_frame, text=f'Add game clients under "instances" in {store.path}',
+                     font=("Arial", 10), fg=self.subtle_text, bg=self.bg_color).pack()
+        for instance, engine in self.rig.members:
+            self.rows.append(self.create_row(main_frame, instance, engine))
+        self.control = ControlServer.from_config([(instance["name"], engine) for instance, engine in self.rig.members],
+                                                 store.data, control_port)
+        if self.control:
+            self.engine_thread.submit(self.control.start())
         
-        self.is_monitoring = True
-        self.start_btn.config(state=tk.DISABLED)
-        self.stop_btn.config(state=tk.NORMAL)
-        self.player_entry.config(state=tk.DISABLED)
+        footer_frame = tk.Frame(main_frame, bg=self.bg_color)
+        footer_frame.pack(fill=tk.X, pady=(10, 0))
+        tk.Button(footer_frame, text="FOLLOW ALL", font=("Arial", 9, "bold"), bg="#27ae60", fg=self.text_color,
+                  relief=tk.FLAT, bd=0, command=self.follow_all, padx=10).pack(side=tk.LEFT)
+        tk.Button(footer_frame, text="STOP ALL", font=("Arial", 9, "bold"), bg="#e74c3c", fg=self.text_color,
+                  relief=tk.FLAT, bd=0, command=self.stop_all, padx=10).pack(side=tk.LEFT, padx=(10, 0))
+        self.stats_label = tk.Label(footer_frame, text="", font=("Arial", 8), fg=self.subtle_text, bg=self.bg_color)
+        self.stats_label.pack(side=tk.RIGHT)
         
-        self.update_status(f"Following {self.target_player} on camera {self.verified_camera_index}")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.process_ui_queue()
+        self.update_stats_display()
+    
+    def create_row(self, parent, instance, engine):
+        """Build the name / player / camera / buttons / status line for one client"""
+        row = {"instance": instance, "engine": engine}
+        frame = tk.Frame(parent, bg=self.card_color)
+        frame.pack(fill=tk.X, pady=(0, 6))
         
-        def follow_loop():
-            error_count = 0
-            
-            while self.is_monitoring:
-                try:
-                    success = self.switch_camera_to_index(self.verified_camera_index)
-                    
-                    if success:
-                        error_count = 0
-                    else:
-                        error_count += 1
-                    
-                    if error_count >= 3:
-                        api_camera = self.get_api_suggested_camera(self.target_player)
-                        if api_camera:
-                            final_camera = self.apply_correction(self.target_player, api_camera)
-                            self.verified_camera_index = final_camera
-                            self.update_camera_display(final_camera)
-                            error_count = 0
-                        else:
-                            self.update_status("Player left the match", is_error=True)
-                            self.stop_following()
-                            break
-                    
-                    time.sleep(2)
-                except:
-                    time.sleep(5)
-        
-        threading.Thread(target=follow_loop, daemon=True).start()
+        tk.Label(frame, text=instance["name"], font=("Arial", 10, "bold"), width=10, anchor=tk.W,
+                 fg=self.accent_color, bg=self.card_color).pack(side=tk.LEFT, padx=(10, 5), pady=6)
+        row["entry"] = tk.Entry(frame, font=("Arial", 10), width=18, bg="#505050", fg=self.text_color,
+                                insertbackground=self.text_color, relief=tk.FLAT, bd=0)
+        row["entry"].pack(side=tk.LEFT, ipady=4)
+        row["entry"].insert(0, instance.get("player", ""))
+        row["entry"].bind('<Return>', lambda e: self.follow_row(row))
         
-    def stop_following(self):
-        self.is_monitoring = False
-        self.start_btn.config(state=tk.NORMAL)
-        self.stop_btn.config(state=tk.DISABLED)
-        self.player_entry.config(state=tk.NORMAL)
-        self.update_status("Stopped following")
+        row["camera"] = tk.Label(frame, text="--", font=("Arial", 12, "bold"), width=3,
+                                 fg=self.accent_color, bg=self.card_color)
+        row["camera"].pack(side=tk.LEFT, padx=5)
+        for text, adjustment in (("−", -1), ("+", 1)):
+            tk.Button(frame, text=text, font=("Arial", 10, "bold"), bg="#505050", fg=self.text_color,
+                      relief=tk.FLAT, bd=0, width=2,
+                      command=lambda adjustment=adjustment: self.engine_thread.submit(engine.adjust_camera(adjustment))
+                      ).pack(side=tk.LEFT, padx=1)
+        row["follow_btn"] = tk.Button(frame, text="FOLLOW", font=("Arial", 9, "bold"), bg="#27ae60",
+                                      fg=self.text_color, relief=tk.FLAT, bd=0, padx=8,
+                                      command=lambda: self.follow_row(row))
+        row["follow_btn"].pack(side=tk.LEFT, padx=(8, 2))
+        row["stop_btn"] = tk.Button(frame, text="STOP", font=("Arial", 9, "bold"), bg="#e74c3c",
+                                    fg=self.text_color, relief=tk.FLAT, bd=0, padx=8, state=tk.DISABLED,
+                                    command=lambda: self.run_on_engine(engine.stop_following))
+        row["stop_btn"].pack(side=tk.LEFT, padx=2)
+        row["status"] = tk.Label(frame, text="Idle", font=("Arial", 8), width=36, anchor=tk.W,
+                                 fg=self.subtle_text, bg=self.card_color)
+        row["status"].pack(side=tk.LEFT, padx=(8, 10))
+        
+        engine.on_status = lambda message, is_error=False: self.post_ui(self.update_row_status, row, message, is_error)
+        engine.on_camera = lambda camera_index: self.post_ui(
+            lambda: row["camera"].config(text=str(camera_index) if camera_index else "--"))
+        engine.on_follow_state = lambda following: self.post_ui(self.update_row_buttons, row, following)
+        engine.on_config_changed = self.store.save
+        return row
+    
+    def update_row_status(self, row, message, is_error=False):
+        row["status"].config(text=message, fg="#e74c3c" if is_error else self.subtle_text)
+    
+    def update_row_buttons(self, row, following):
+        row["follow_btn"].config(state=tk.DISABLED if following else tk.NORMAL)
+        row["stop_btn"].config(state=tk.NORMAL if following else tk.DISABLED)
+        row["entry"].config(state=tk.DISABLED if following else tk.NORMAL)
+    
+    def update_stats_display(self):
+        """Refresh the rig-wide poll rate / latency / error line once a second"""
+        self.stats_label.config(text=self.rig.metrics.summary())
+        self.root.after(1000, self.update_stats_display)
+    
+    def follow_row(self, row):
+        """Save the row's targets and start following them"""
+        text = row["entry"].get().strip()
+        if not text:
+            self.update_row_status(row, "Enter a player name", True)
+            return
+        self.run_on_engine(self.remember_player, row["instance"], text)
+        self.engine_thread.submit(row["engine"].follow_targets(parse_targets(text)))
+    
+    def remember_player(self, instance, text):
+        """Store a row's targets; runs on the engine thread, which owns the config"""
+        instance["player"] = text
+        self.store.save()
+    
+    def follow_all(self):
+        for row in self.rows:
+            if row["entry"].get().strip() and not row["engine"].is_monitoring:
+                self.follow_row(row)
+    
+    def stop_all(self):
+        for row in self.rows:
+            self.run_on_engine(row["engine"].stop_following)
     
     def on_closing(self):
-        """Save config and close"""
-        self.is_monitoring = False
-        self.save_config()
+        """Stop every client, save config and close"""
+        self.run_on_engine(self.rig.close)
+        self.store.flush()
+        self.engine_thread.stop()
         self.root.destroy()
 
+def status_logger(prefix=""):
+    """on_status for headless modes; a status repeated while waiting is logged again only at debug level"""
+    last = [None]
+    def on_status(message, is_error=False):
+        if message == last[0]:
+            level = logging.DEBUG
+        else:
+            level = logging.ERROR if is_error else logging.INFO
+        last[0] = message
+        log.log(level, "%s%s", prefix, message)
+    return on_status
+
+async def run_headless(engine, targets, stop_event=None, control=None, watch=True):
+    """Follow a player without a window until SIGINT/SIGTERM
+    
+    The control API may change engine.targets or stop following; the loop follows
+    whatever the engine's targets are at the time. Unless watch is False, the session
+    is also polled lightly while not following, to keep the UI settings applied.
+    """
+    loop = asyncio.get_running_loop()
+    stop_event = stop_event or asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, AttributeError, ValueError):
+            # Windows has no loop signal handlers; fall back to the process-wide hook
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+    
+    stopper = asyncio.ensure_future(stop_event.wait())
+    profiler = None
+    if engine.profile_file:
+        profiler = asyncio.ensure_future(engine.profile_loop())
+    watcher = asyncio.ensure_future(engine.watch_idle()) if watch else None
+    if control:
+        await control.start()
+    engine.targets = list(targets)
+    try:
+        while not stop_event.is_set():
+            # Wait for the player to show up, then follow until we are stopped
+            if engine.is_monitoring and engine.follow_task:
+                await asyncio.wait([engine.follow_task, stopper], return_when=asyncio.FIRST_COMPLETED)
+                continue
+            if engine.targets and await engine.follow_targets(engine.targets):
+                continue
+            await asyncio.wait([stopper], timeout=engine.scheduler.next_delay())
+    finally:
+        stopper.cancel()
+        if profiler:
+            profiler.cancel()
+        if watcher:
+            watcher.cancel()
+        if control:
+            control.close()
+        engine.close()
+        log.info("Stopped (%s)", engine.metrics.summary())
+
+async def run_rig(rig, stop_event=None, control=None):
+    """Follow every rig client's configured player until SIGINT/SIGTERM"""
+    stop_event = stop_event or asyncio.Event()
+    if control:
+        await control.start()
+    runs = []
+    for instance, engine in rig.members:
+        if instance.get("player"):
+            runs.append(run_headless(engine, parse_targets(instance["player"]), stop_event))
+        else:
+            log.warning("[%s] No player set, skipping", instance["name"])
+    try:
+        await asyncio.gather(*runs)
+    finally:
+        if control:
+            control.close()
+        # run_headless closes each engine; the pool they share goes last
+        rig.http.close()
+
+async def run_replay(engine, targets):
+    """Run the headless follower against a ReplayClient until the recording ends"""
+    stop_event = asyncio.Event()
+    engine.client.on_finished = stop_event.set
+    # Every extra poll would take a frame from the follower
+    await run_headless(engine, targets, stop_event, watch=False)
+    log.info("Replayed %d polls, sent %d commands", engine.client.frames_served, len(engine.client.commands))
+
+def run_multi_headless(args, store):
+    """Headless --multi: follow each instance's configured player"""
+    rig = Rig(store.data, args.profile)
+    if not rig.members:
+        log.error('No game clients under "instances" in %s', args.config)
+        return
+    metrics_port = args.metrics_port or store.data.get("metrics_port")
+    if metrics_port:
+        serve_metrics(rig.metrics, metrics_port)
+        log.info("Metrics on http://127.0.0.1:%d/metrics", metrics_port)
+    for instance, engine in rig.members:
+        name = instance["name"]
+        engine.on_status = status_logger(f"[{name}] ")
+        engine.on_config_changed = store.save
+        if args.rate:
+            engine.scheduler.idle_interval = 1 / args.rate
+    control = ControlServer.from_config([(instance["name"], engine) for instance, engine in rig.members],
+                                        store.data, args.control_port)
+    try:
+        asyncio.run(run_rig(rig, control=control))
+    finally:
+        store.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Echo VR camera follower")
+    parser.add_argument("--headless", action="store_true", help="run without the Tk window")
+    parser.add_argument("--player", help="player to follow, or a ranked comma list of players and team:<color> "
+                                         "entries (required with --headless)")
+    parser.add_argument("--director", help="comma list of auto-director rules: " + ", ".join(AutoDirector.RULES))
+    parser.add_argument("--rate", type=float, help="idle polls per second")
+    parser.add_argument("--url", default="http://127.0.0.1:6721", help="Echo VR API base URL")
+    parser.add_argument("--config", default="config.json", help="config file path")
+    parser.add_argument("--record", metavar="FILE", help="append every /session frame to a .jsonl.gz recording")
+    parser.add_argument("--replay", metavar="FILE", help="follow against a recording instead of the game (headless)")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="replay clock multiplier; 0 serves the next frame on every poll")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--profile", metavar="FILE", help="write cProfile stats for the engine thread to FILE")
+    parser.add_argument("--control-port", type=int,
+                        help="serve the local control API (HTTP and WebSocket) on 127.0.0.1:PORT")
+    parser.add_argument("--multi", action="store_true",
+                        help='drive every game client listed under "instances" in the config from one process')
+    args = parser.parse_args(argv)
+    
+    if args.replay:
+        args.headless = True
+    
+    if not args.headless:
+        import_tk()
+        root = tk.Tk()
+        if args.multi:
+            store = ConfigStore(args.config)
+            store.debounce = store.data.get("save_debounce", 1.0)
+            app = RigWindow(root, store, args.control_port, args.metrics_port, args.profile)
+        else:
+            app = EchoVRFollowMe(root, args.control_port, args.metrics_port, args.profile,
+                                 config_file=args.config, base_url=args.url, rate=args.rate, record_file=args.record)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: root.after(0, app.on_closing))
+        root.mainloop()
+        return
+    
+    if not args.player and not args.multi:
+        parser.error("--player is required with --headless")
+    
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    # Failed requests are already reported as status lines and counted in the metrics
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)
+    store = ConfigStore(args.config)
+    config = store.data
+    store.debounce = config.get("save_debounce", 1.0)
+    
+    if args.multi:
+        run_multi_headless(args, store)
+        return
+    
+    if args.replay:
+        config.pop("record_file", None)
+        engine = FollowEngine(config, client=ReplayClient(args.replay, args.speed))
+        # Keep the scheduler's timing relative to the replay clock; step mode never waits
+        engine.scheduler.scale(1 / args.speed if args.speed else 0)
+        # Verification windows, drift checks and director dwell run on recording time
+        engine.clock = engine.client.clock
+    else:
+        engine = FollowEngine(config, args.url, record_file=args.record)
+        if args.rate:
+            engine.scheduler.idle_interval = 1 / args.rate
+    # Command-line instrumentation applies to this run only and is not saved
+    if args.profile:
+        engine.profile_file = args.profile
+    metrics_port = args.metrics_port or config.get("metrics_port")
+    if metrics_port:
+        serve_metrics(engine.metrics, metrics_port)
+        log.info("Metrics on http://127.0.0.1:%d/metrics", metrics_port)
+    engine.on_status = status_logger()
+    engine.on_camera = lambda camera_index: log.debug("Camera %s", camera_index)
+    engine.on_poll = lambda mode, delay: log.debug("Polling %s every %.0f ms", mode, delay * 1000)
+    if args.director:
+        engine.director_settings["rules"] = parse_targets(args.director)
+    targets = parse_targets(args.player)
+    if args.replay:
+        asyncio.run(run_replay(engine, targets))
+        return
+    engine.on_config_changed = store.save
+    control = ControlServer.from_config([("default", engine)], config, args.control_port)
+    try:
+        asyncio.run(run_headless(engine, targets, control=control))
+    finally:
+        store.flush()
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = EchoVRFollowMe(root)
-    root.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
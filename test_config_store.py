@@ -0,0 +1,111 @@
+"""ConfigStore: migrating old configs, debounced saves and atomic writes"""
+import json
+import os
+import time
+
+import pytest
+
+from spectate import CONFIG_VERSION, ConfigStore
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def test_missing_file_starts_current(tmp_path):
+    store = ConfigStore(str(tmp_path / "config.json"))
+    assert store.data == {"corrections": {}, "last_username": "", "version": CONFIG_VERSION}
+    assert not os.path.exists(store.path)
+
+def test_unversioned_config_is_migrated(tmp_path):
+    path = str(tmp_path / "config.json")
+    write_json(path, {"corrections": {"alice": -1}, "minimap_visibility": False})
+    store = ConfigStore(path)
+    assert store.data == {"corrections": {"alice": -1}, "minimap_visibility": False,
+                          "last_username": "", "version": CONFIG_VERSION}
+
+def test_newer_config_keeps_its_version(tmp_path, capsys):
+    path = str(tmp_path / "config.json")
+    newer = {"version": CONFIG_VERSION + 1, "corrections": {}, "something_new": [1, 2]}
+    write_json(path, newer)
+    store = ConfigStore(path)
+    assert store.data == newer
+    assert "newer" in capsys.readouterr().out
+    store.save()
+    store.flush()
+    assert read_json(path) == newer
+
+def test_unreadable_config_is_moved_aside(tmp_path, capsys):
+    path = str(tmp_path / "config.json")
+    with open(path, "w") as f:
+        f.write('{"corrections": {"alice": ')
+    store = ConfigStore(path)
+    assert store.data["corrections"] == {}
+    assert not os.path.exists(path)
+    with open(path + ".bad") as f:
+        assert f.read() == '{"corrections": {"alice": '
+    assert ".bad" in capsys.readouterr().out
+
+def test_saves_inside_the_window_become_one_write(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(path, debounce=0.2)
+    store.data["corrections"]["alice"] = 1
+    store.save()
+    timer = store.timer
+    store.data["corrections"]["alice"] = 2
+    store.save()
+    assert store.timer is timer
+    assert not os.path.exists(path)
+    # Changes after the last save wait for the next one
+    store.data["corrections"]["alice"] = 3
+    timer.join(5)
+    assert read_json(path)["corrections"] == {"alice": 2}
+    assert store.timer is None and store.pending is None
+
+def test_flush_writes_straight_away(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(path, debounce=60)
+    store.data["last_username"] = "alice"
+    store.save()
+    started = time.monotonic()
+    store.flush()
+    assert time.monotonic() - started < 5
+    assert read_json(path)["last_username"] == "alice"
+    assert os.listdir(tmp_path) == ["config.json"]
+    # Nothing pending, so a second flush leaves the file alone
+    os.remove(path)
+    store.flush()
+    assert not os.path.exists(path)
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(path)
+    store.save()
+    store.flush()
+    before = read_json(path)
+
+    def broken_fsync(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "fsync", broken_fsync)
+    store.data["last_username"] = "alice"
+    store.save()
+    store.flush()
+    assert "disk full" in capsys.readouterr().out
+    assert read_json(path) == before
+    assert store.pending is not None
+
+    monkeypatch.undo()
+    store.flush()
+    assert read_json(path)["last_username"] == "alice"
+
+@pytest.mark.parametrize("version", [1, CONFIG_VERSION])
+def test_saved_config_loads_back_unchanged(tmp_path, version):
+    path = str(tmp_path / "config.json")
+    write_json(path, {"version": version, "corrections": {"bob": 2}, "last_username": "bob"})
+    store = ConfigStore(path)
+    store.save()
+    store.flush()
+    assert ConfigStore(path).data == store.data
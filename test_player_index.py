@@ -0,0 +1,73 @@
+"""PlayerIndex lookups: slots, case, clan tags and typed names"""
+from mock_server import MockEchoVR
+from spectate import PlayerIndex, normalize_name
+
+def index_for(blue, orange, spectators=()):
+    index = PlayerIndex()
+    mock = MockEchoVR(teams={"BLUE TEAM": list(blue), "ORANGE TEAM": list(orange), "SPECTATORS": list(spectators)})
+    assert index.update(mock.session_json())
+    return index
+
+def test_static_camera_slots():
+    index = index_for(["b0", "b1"], ["o0", "o1"], ["spec"])
+    assert index.entries["b1"] == ("BLUE TEAM", 1, 7)
+    assert index.entries["o0"] == ("ORANGE TEAM", 0, 1)
+    assert index.entries["spec"] == ("SPECTATORS", 0, None)
+
+def test_rebuilds_only_when_the_roster_changes():
+    mock = MockEchoVR()
+    index = PlayerIndex()
+    assert index.update(mock.session_json())
+    entries = index.entries
+    mock.camera = 7
+    assert not index.update(mock.session_json())
+    assert index.entries is entries
+    mock.apply({"action": "join", "team": "BLUE TEAM", "name": "late", "index": 0})
+    assert index.update(mock.session_json())
+    assert index.entries["blue0"][2] == 7
+
+def test_exact_names_ignore_case():
+    index = index_for(["Alice"], ["BOB"])
+    assert index.key_for("alice") == "alice"
+    assert index.key_for("bob") == "bob"
+    assert index.names["bob"] == "BOB"
+    assert index.key_for("carol") is None
+
+def test_missing_clan_tag_matches_a_unique_player():
+    index = index_for(["[AB] Alice"], ["(xy)bob"])
+    assert normalize_name("[AB] Alice") == "alice"
+    assert index.key_for("alice") == "[ab] alice"
+    assert index.key_for("BOB") == "(xy)bob"
+    assert index.resolve("Alice") == "[AB] Alice"
+
+def test_clan_tag_collision_keeps_both_players():
+    index = index_for(["[AB]bob"], ["[CD]bob"])
+    assert len(index.entries) == 2
+    assert index.normalized["bob"] == ["[ab]bob", "[cd]bob"]
+    assert index.key_for("[cd]BOB") == "[cd]bob"
+    assert index.entries[index.key_for("[AB]bob")][0] == "BLUE TEAM"
+    # Without the tag either could be meant
+    assert index.key_for("bob") is None
+    assert index.resolve("bob") is None
+    assert index.suggestions("bo") == ["[AB]bob", "[CD]bob"]
+
+def test_name_that_is_only_a_tag():
+    index = index_for(["[AB]"], [])
+    assert normalize_name("[AB]") == "[ab]"
+    assert index.key_for("[ab]") == "[ab]"
+
+def test_typos_and_prefixes_resolve():
+    index = index_for(["Skywalker", "Solo"], ["Chewbacca"])
+    assert index.resolve("chew") == "Chewbacca"
+    assert index.resolve("skywalkr") == "Skywalker"
+    assert index.resolve("s") is None
+    assert index.resolve("nobody") is None
+    assert index.suggestions("s") == ["Skywalker", "Solo"]
+    assert index.suggestions("bac") == ["Chewbacca"]
+
+def test_queries_do_not_grow_the_cache():
+    index = index_for(["[AB]bob"], ["carol"])
+    for query in ["bob", "[ZZ]bob", "caro", "someone else"]:
+        index.resolve(query)
+        index.suggestions(query)
+    assert set(index.normalized_cache) == {"[AB]bob", "carol"}
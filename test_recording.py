@@ -0,0 +1,133 @@
+"""diff_json/patch_json round trips and the recordings built on them"""
+import copy
+import os
+import random
+
+import pytest
+
+from bench_parse import mock_frames
+from mock_server import SCENARIOS
+from spectate import SessionRecorder, diff_json, patch_json, read_recording
+
+def random_value(rng, depth=0):
+    kind = rng.choice(["int", "str", "none", "bool", "float"] + (["dict", "list"] if depth < 3 else []))
+    if kind == "dict":
+        return {rng.choice("abcdef"): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    if kind == "list":
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {"int": rng.randint(-3, 3), "str": rng.choice(["", "x", "0"]), "none": None,
+            "bool": rng.random() < 0.5, "float": rng.choice([0.0, 1.5])}[kind]
+
+def mutated(value, rng):
+    """A copy of value with a few random edits somewhere inside"""
+    if isinstance(value, dict) and value and rng.random() < 0.7:
+        result = dict(value)
+        key = rng.choice(list(result))
+        action = rng.random()
+        if action < 0.3:
+            del result[key]
+        elif action < 0.5:
+            result[rng.choice("ghij")] = random_value(rng)
+        else:
+            result[key] = mutated(result[key], rng)
+        return result
+    if isinstance(value, list) and value and rng.random() < 0.7:
+        result = list(value)
+        if rng.random() < 0.3:
+            result.append(random_value(rng))
+        else:
+            index = rng.randrange(len(result))
+            result[index] = mutated(result[index], rng)
+        return result
+    return random_value(rng)
+
+def test_equal_values_have_no_delta():
+    frame = mock_frames("idle")[0]
+    assert diff_json(frame, copy.deepcopy(frame)) is None
+    assert patch_json(frame, None) is frame
+
+@pytest.mark.parametrize("seed", range(200))
+def test_random_round_trip(seed):
+    rng = random.Random(seed)
+    old = random_value(rng)
+    new = mutated(old, rng)
+    before = copy.deepcopy(old)
+    assert patch_json(old, diff_json(old, new)) == new
+    assert old == before
+
+def test_delta_kinds():
+    assert diff_json({"a": 1, "b": 2}, {"a": 1, "c": 3}) == ["d", {"c": ["=", 3]}, ["b"]]
+    assert diff_json([1, 2, 3], [1, 5, 3]) == ["l", {"1": ["=", 5]}]
+    assert diff_json([1, 2], [1, 2, 3]) == ["=", [1, 2, 3]]
+    assert diff_json({"a": 1}, [1]) == ["=", [1]]
+    assert diff_json(1, 1.5) == ["=", 1.5]
+
+def test_unchanged_subtrees_are_shared():
+    old = {"teams": [{"team": "BLUE TEAM"}, {"team": "ORANGE TEAM"}], "disc": {"position": [0, 0, 0]}}
+    new = copy.deepcopy(old)
+    new["disc"]["position"] = [1, 0, 0]
+    patched = patch_json(old, diff_json(old, new))
+    assert patched == new
+    assert patched["teams"] is old["teams"]
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_consecutive_mock_frames(scenario):
+    frames = mock_frames(scenario)
+    for old, new in zip(frames, frames[1:]):
+        assert patch_json(old, diff_json(old, new)) == new
+
+def test_recording_reads_back_every_frame(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    frames = mock_frames("chaos")
+    recorder = SessionRecorder(path)
+    for frame in frames + [frames[-1], None, frames[0]]:
+        recorder.record(frame)
+    recorder.close()
+
+    # Appending starts a new segment that does not depend on the first one
+    recorder = SessionRecorder(path)
+    recorder.record(frames[2])
+    recorder.close()
+
+    replayed = [data for _, data in read_recording(path)]
+    assert replayed == frames + [frames[-1], None, frames[0], frames[2]]
+
+
+def crashed_recording(path, frames):
+    """A recording whose writer was killed after flushing, before closing the gzip stream"""
+    recorder = SessionRecorder(path)
+    for frame in frames:
+        recorder.record(frame)
+    recorder.file.flush()
+    with open(path, "rb") as f:
+        data = f.read()
+    recorder.close()
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_truncated_recording_reads_up_to_the_crash(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    frames = mock_frames("chaos")
+    crashed_recording(path, frames)
+    assert [data for _, data in read_recording(path)] == frames
+
+    # Cut into the middle of the compressed data as well
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+    replayed = [data for _, data in read_recording(path)]
+    assert replayed == frames[:len(replayed)]
+
+def test_recording_over_a_truncated_file_starts_a_new_one(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    frames = mock_frames("chaos")
+    crashed_recording(path, frames)
+
+    recorder = SessionRecorder(path)
+    recorder.record(frames[1])
+    recorder.close()
+
+    assert [data for _, data in read_recording(path)] == [frames[1]]
+    partial, = [name for name in os.listdir(tmp_path) if name.endswith(".partial")]
+    assert [data for _, data in read_recording(str(tmp_path / partial))] == frames
@@ -0,0 +1,96 @@
+"""scan_session must agree with a full json.loads on everything the follower reads"""
+import json
+import random
+
+import pytest
+
+from bench_parse import follower_fields, mock_frames
+from mock_server import SCENARIOS, MockEchoVR
+from spectate import scan_fields, scan_session
+
+AWKWARD_NAMES = [
+    "[AB]bob",
+    "{curly}",
+    "]}{[",
+    'say "hi"',
+    "back\\slash",
+    "tab\there",
+    "line\nbreak",
+    "café",
+    "プレイヤー",
+    '[x"]y',
+    "\\",
+]
+
+def encodings(frame):
+    """The frame as the game (indented), compactly and with non-ASCII left unescaped"""
+    yield json.dumps(frame, indent=2).encode()
+    yield json.dumps(frame, separators=(",", ":")).encode()
+    yield json.dumps(frame, ensure_ascii=False).encode("utf-8")
+
+def shuffled(value, rng):
+    """Copy of a decoded frame with every object's keys in random order"""
+    if isinstance(value, dict):
+        items = list(value.items())
+        rng.shuffle(items)
+        return {key: shuffled(item, rng) for key, item in items}
+    if isinstance(value, list):
+        return [shuffled(item, rng) for item in value]
+    return value
+
+def assert_agrees(raw):
+    assert scan_session(raw) == follower_fields(json.loads(raw))
+
+@pytest.mark.parametrize("scenario", sorted(SCENARIOS))
+def test_mock_frames_are_scanned_without_falling_back(scenario):
+    for frame in mock_frames(scenario):
+        for raw in encodings(frame):
+            assert scan_fields(raw) is not None
+            assert_agrees(raw)
+
+def test_sessionid_and_pov_are_kept():
+    fields = scan_session(json.dumps(MockEchoVR().session_json()).encode())
+    assert fields["sessionid"] == "00000000-0000-0000-0000-000000000000"
+    assert fields["player"]["vr_position"] == [0.0, 0.0, 0.0]
+
+@pytest.mark.parametrize("name", AWKWARD_NAMES)
+def test_names_with_brackets_quotes_and_escapes(name):
+    mock = MockEchoVR()
+    mock.teams["BLUE TEAM"].insert(1, name)
+    mock.teams["ORANGE TEAM"].append(name + "2")
+    for raw in encodings(mock.session_json()):
+        assert_agrees(raw)
+
+def test_every_awkward_name_in_one_frame():
+    mock = MockEchoVR(teams={"BLUE TEAM": AWKWARD_NAMES[:6], "ORANGE TEAM": AWKWARD_NAMES[6:], "SPECTATORS": []})
+    mock.camera = 7
+    for raw in encodings(mock.session_json()):
+        assert_agrees(raw)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_shuffled_key_order(seed):
+    rng = random.Random(seed)
+    mock = MockEchoVR()
+    mock.teams["BLUE TEAM"].append(rng.choice(AWKWARD_NAMES))
+    mock.camera = rng.randint(1, 10)
+    frame = shuffled(mock.session_json(), rng)
+    for raw in encodings(frame):
+        assert_agrees(raw)
+
+def test_team_without_players_key():
+    mock = MockEchoVR(teams={"BLUE TEAM": [], "ORANGE TEAM": ["orange0"], "SPECTATORS": []})
+    frame = mock.session_json()
+    assert "players" not in frame["teams"][0]
+    raw = json.dumps(frame).encode()
+    assert scan_fields(raw) is not None
+    assert scan_session(raw)["teams"][0] == {"team": "BLUE TEAM"}
+    assert_agrees(raw)
+
+def test_unexpected_layout_falls_back_to_json_loads():
+    raw = json.dumps({"teams": [{"players": [{"name": "a", "head": {"position": [1, 2, 3]}}]}]}).encode()
+    assert scan_fields(raw) is None
+    assert scan_session(raw) == json.loads(raw)
+
+def test_invalid_json_still_raises():
+    with pytest.raises(ValueError):
+        scan_session(b'{"teams": [')
@@ -0,0 +1,116 @@
+"""SlotVerifier: learning slots from the POV, ruling guesses out and pinning"""
+import asyncio
+
+from mock_server import MockEchoVR
+from spectate import SessionSnapshot, SlotVerifier
+
+def snapshot_of(mock):
+    async def fetch():
+        return mock.session_json()
+    snapshot = SessionSnapshot(fetch)
+    asyncio.run(snapshot.refresh())
+    return snapshot
+
+def test_verified_slot_wins_over_the_guess():
+    snapshot = snapshot_of(MockEchoVR())
+    verifier = SlotVerifier()
+    assert verifier.camera_for(snapshot, "blue1", 7) == 7
+    verifier.learn("blue1", 9)
+    assert verifier.is_verified("blue1")
+    assert verifier.camera_for(snapshot, "blue1", 7) == 9
+
+def test_teammates_share_the_learned_offset():
+    snapshot = snapshot_of(MockEchoVR(blue_offset=1))
+    verifier = SlotVerifier()
+    verifier.sync(snapshot.index)
+    verifier.learn("blue0", 7)
+    assert verifier.camera_for(snapshot, "blue2", 8) == 9
+    # The orange team keeps its own slots
+    assert verifier.camera_for(snapshot, "orange1", 2) == 2
+
+def test_learning_a_slot_rules_it_out_for_whoever_had_it():
+    snapshot = snapshot_of(MockEchoVR())
+    verifier = SlotVerifier()
+    verifier.sync(snapshot.index)
+    verifier.learn("blue0", 6)
+    verifier.learn("blue1", 6)
+    assert not verifier.is_verified("blue0")
+    assert verifier.camera_for(snapshot, "blue0", 6) != 6
+
+def test_ruled_out_guess_falls_back_to_untried_team_slots():
+    snapshot = snapshot_of(MockEchoVR())
+    verifier = SlotVerifier()
+    verifier.sync(snapshot.index)
+    verifier.rule_out("blue2", 8)
+    verifier.learn("blue0", 6)
+    assert verifier.camera_for(snapshot, "blue2", 8) == 7
+    verifier.rule_out("blue2", 7)
+    assert verifier.camera_for(snapshot, "blue2", 8) == 9
+
+def test_pinned_slot_is_kept_until_it_shows_someone_else():
+    snapshot = snapshot_of(MockEchoVR())
+    verifier = SlotVerifier()
+    verifier.sync(snapshot.index)
+    verifier.pin("blue2", 7)
+    assert verifier.is_pinned("blue2")
+    assert verifier.camera_for(snapshot, "blue2", 8) == 7
+    # Whoever the slot shows first is what the pin means, even if it is not the target
+    assert not verifier.pinned_moved("blue2", "blue1")
+    assert not verifier.pinned_moved("blue2", "blue1")
+    assert verifier.pinned_moved("blue2", "orange0")
+
+def test_roster_change_clears_pins():
+    mock = MockEchoVR()
+    verifier = SlotVerifier()
+    snapshot = snapshot_of(mock)
+    verifier.sync(snapshot.index)
+    verifier.pin("blue2", 7)
+    assert not verifier.sync(snapshot.index)
+    assert verifier.is_pinned("blue2")
+    mock.apply({"action": "join", "team": "ORANGE TEAM", "name": "late"})
+    assert verifier.sync(snapshot_of(mock).index)
+    assert not verifier.is_pinned("blue2")
+    assert not verifier.is_verified("blue2")
+
+def test_team_offset_carries_over_to_the_next_roster():
+    mock = MockEchoVR(blue_offset=1)
+    verifier = SlotVerifier()
+    snapshot = snapshot_of(mock)
+    verifier.sync(snapshot.index)
+    verifier.learn("blue1", 8)
+    mock.apply({"action": "join", "team": "ORANGE TEAM", "name": "late"})
+    snapshot = snapshot_of(mock)
+    assert verifier.sync(snapshot.index)
+    assert not verifier.is_verified("blue1")
+    assert verifier.offsets == {"BLUE TEAM": 1}
+    assert verifier.camera_for(snapshot, "blue1", 7) == 8
+    assert verifier.camera_for(snapshot, "blue2", 8) == 9
+    assert verifier.camera_for(snapshot, "orange0", 1) == 1
+
+def test_wrong_prediction_rolls_back_to_the_previous_slot():
+    mock = MockEchoVR()
+    verifier = SlotVerifier()
+    snapshot = snapshot_of(mock)
+    verifier.sync(snapshot.index)
+    verifier.learn("blue2", 8)
+    mock.apply({"action": "join", "team": "BLUE TEAM", "name": "late", "index": 0})
+    snapshot = snapshot_of(mock)
+    assert verifier.sync(snapshot.index)
+    verifier.predict("blue2", 8)
+    assert verifier.is_predicted("blue2")
+    # The static slot moved with the join and the offset is still 0
+    assert verifier.camera_for(snapshot, "blue2", 9) == 9
+    verifier.rule_out("blue2", 9)
+    assert verifier.camera_for(snapshot, "blue2", 9) == 8
+    verifier.learn("blue2", 8)
+    assert not verifier.is_predicted("blue2")
+    assert verifier.camera_for(snapshot, "blue2", 9) == 8
+
+def test_prediction_is_forgotten_with_the_next_roster():
+    mock = MockEchoVR()
+    verifier = SlotVerifier()
+    verifier.sync(snapshot_of(mock).index)
+    verifier.predict("blue2", 8)
+    mock.apply({"action": "leave", "name": "orange0"})
+    verifier.sync(snapshot_of(mock).index)
+    assert not verifier.is_predicted("blue2")